@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# analyses kept in memory before the least recently used are dropped
+MAX_ENTRIES = 10000
+
+
+class AnalysisCache:
+    """Memoizes checker output for problem source code.
+
+    Entries are keyed on the problem name, the sliced problem code and the version
+    of the checker set that analyzed it, and hold the problem's comments as
+    (line number relative to the slice, comment, fields) triples. An optional
+    directory adds a persistent tier shared across sessions.
+
+    Arguments:
+    directory -- where to persist analyses, or None to keep them in memory only
+    max_entries -- size of the in-memory tier
+    """
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES):
+        self.directory = None
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        if directory is not None:
+            self.persist(directory)
+
+    def persist(self, directory):
+        """Read and write analyses under `directory` in addition to memory."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    @staticmethod
+    def key(name, code, version):
+        return hashlib.sha256(f"{name}\0{version}\0{code}".encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached comments for `key`, or None on a miss."""
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        comments = self._load(key)
+        with self._lock:
+            if comments is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, comments)
+        return comments
+
+    def put(self, key, comments):
+        comments = [(line_num, comment, tuple(fields)) for line_num, comment, fields in comments]
+        with self._lock:
+            self._remember(key, comments)
+        if self.directory is not None:
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "w") as f:
+                json.dump(comments, f)
+            os.replace(tmp, os.path.join(self.directory, f"{key}.json"))
+
+    def _remember(self, key, comments):
+        self.entries[key] = comments
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{key}.json")) as f:
+                return [
+                    (line_num, comment, tuple(fields))
+                    for line_num, comment, fields in json.load(f)
+                ]
+        except (OSError, ValueError):
+            return None
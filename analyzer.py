@@ -1,34 +1,59 @@
 import ast
-from typing import Dict, List, Generator, Type, NamedTuple
+import hashlib
+import inspect
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from importlib import import_module
+from importlib.util import find_spec
+from typing import Dict, List, Generator, Type, NamedTuple, Optional, Tuple
 from stringcase import snakecase
 
-#TODO: update PROBLEMS declaration to match project
+from analysis_cache import AnalysisCache
+from profiling import CheckerRecord, CheckerStats
 
-# PROBLEMS = {
-#    "roll_dice": ["def roll_dice", "def free_bacon"],
-#    "play": ["def play", "#######################"],
-#    "max_scoring_num_rolls": ["def max_scoring_num_rolls", "def winner"],
-# }
-
-# PROBLEMS = {
-#     "accuracy": ["def accuracy", "def wpm"],
-#     "autocorrect": ["def autocorrect", "def sphinx_swap"],
-# }
-
-
-PROBLEMS = {
-    "Short and LongThrowers": ["class ShortThrower", "class FireAnt"],
-    "ThrowerAnt": ["class ThrowerAnt", "def throw_at"],
-    "FireAnt": ["class FireAnt", "class HungryAnt"],
-    "BodyguardAnt - Ant": ["class BodyguardAnt", "class TankAnt"],
-    "BodyguardAnt - Place": ["def add_insect", "def remove_insect"],
-}
+# where each problem starts and ends in the project file: {name: [start marker, end marker]},
+# filled in from the active project's checker pack by load_pack
+PROBLEMS: Dict[str, List[str]] = {}
 
 
 class Comment(NamedTuple):
     line_num: int
     comment: str
-    fields: List[str] = []
+    # placeholders in `comment` for the grader to fill in
+    fields: Tuple[str, ...] = ()
+
+
+class SourceText:
+    """Source code with its line boundaries indexed once.
+
+    Line numbers are 1-based and offsets index into `text`, matching ast node positions.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.split("\n")
+        self.offsets = [0]
+        for line in self.lines[:-1]:
+            self.offsets.append(self.offsets[-1] + len(line) + 1)
+
+    def line(self, line_num: int) -> str:
+        return self.lines[line_num - 1]
+
+    def line_offset(self, line_num: int) -> int:
+        return self.offsets[line_num - 1]
+
+    def offset_line(self, offset: int) -> int:
+        return bisect_right(self.offsets, offset)
+
+    def position_offset(self, line_num: int, col_offset: int) -> int:
+        """Convert an ast (line, UTF-8 byte column) position to an offset."""
+        return self.line_offset(line_num) + len(
+            self.line(line_num).encode()[:col_offset].decode()
+        )
 
 
 class Problem(NamedTuple):
@@ -39,6 +64,7 @@ class Problem(NamedTuple):
 
 def checker(cls):
     CHECKERS.append(cls)
+    REGISTERED.append(cls)
     return cls
 
 
@@ -47,44 +73,368 @@ def question_checker(q):
         if q not in TARGETED_CHECKERS:
             TARGETED_CHECKERS[q] = []
         TARGETED_CHECKERS[q].append(cls)
+        REGISTERED.append(cls)
         return cls
 
     return checker
 
 
 class Checker(ast.NodeVisitor):
+    # set on instances driven by a FusedVisitor, which does the descending itself
+    _fused = False
+
     def comments(self) -> Generator[Comment, None, None]:
         yield NotImplemented
 
+    def generic_visit(self, node):
+        if not self._fused:
+            super().generic_visit(node)
+
 
 CHECKERS: List[Type[Checker]] = []
 TARGETED_CHECKERS: Dict[str, List[Type[Checker]]] = {}
+# every checker class, in the order it was registered
+REGISTERED: List[Type[Checker]] = []
+
+
+def checker_label(cls: Type[Checker]) -> str:
+    """Name `cls` in reports, adding its registration index if another checker shares its name."""
+    name = cls.__qualname__
+    if sum(other.__qualname__ == name for other in REGISTERED) > 1:
+        return f"{name}#{REGISTERED.index(cls)}"
+    return name
+
+# the project being graded, naming a module in checker_packs, an entry point in
+# CHECKER_PACK_GROUP, or the dotted path of any module laid out the same way
+PROJECT = os.environ.get("COMPOSITION_PROJECT", "ants")
+CHECKER_PACK_GROUP = "composition_assistant.checker_packs"
+
+
+# the active checker pack, once load_pack has imported it
+pack = None
+_pack_lock = threading.Lock()
+
+
+def load_pack(project: Optional[str] = None):
+    """Import the checker pack for `project` (default PROJECT) and add its PROBLEMS.
+
+    A pack is a module defining PROBLEMS and registering the project's targeted
+    checkers with @question_checker when imported, so only the active project's
+    checkers are ever loaded. Packs import this module, so importing it never
+    imports a pack: get_problems and check_problem call load_pack on first use.
+    Only the first call imports anything; later calls return the same pack.
+    """
+    global pack
+    if pack is None:
+        with _pack_lock:
+            if pack is None:
+                loaded = import_pack(project or PROJECT)
+                PROBLEMS.update(loaded.PROBLEMS)
+                pack = loaded
+    return pack
+
+
+def import_pack(project: str):
+    """Import and return the checker pack module for `project`."""
+    if "." in project:
+        return import_module(project)
+    if find_spec(f"checker_packs.{project}") is not None:
+        return import_module(f"checker_packs.{project}")
+    from importlib.metadata import entry_points
+
+    found = entry_points(group=CHECKER_PACK_GROUP, name=project)
+    if not found:
+        raise ImportError(f"No checker pack found for project {project!r}")
+    return next(iter(found)).load()
+
+
+# ast.NodeVisitor.visit_Constant forwards to these legacy visitor names based on the value type
+CONSTANT_VISITOR_NAMES = {
+    bool: "NameConstant",
+    type(None): "NameConstant",
+    int: "Num",
+    float: "Num",
+    complex: "Num",
+    str: "Str",
+    bytes: "Bytes",
+    type(...): "Ellipsis",
+}
+
 
+@lru_cache(maxsize=None)
+def dispatch_table(checkers: Tuple[Type[Checker], ...]) -> Dict[str, List[Tuple[int, str]]]:
+    """Map each node key to the (checker index, method name) pairs interested in it.
 
-def get_problems(code: str):
+    Constant nodes are keyed as "Constant.<legacy name>" so that checkers overriding
+    visit_Str, visit_Num, etc. are dispatched exactly as ast.NodeVisitor would.
+    """
+    table = {}
+    for i, cls in enumerate(checkers):
+        for attr in dir(cls):
+            if not attr.startswith("visit_"):
+                continue
+            if getattr(cls, attr) is getattr(ast.NodeVisitor, attr, None):
+                continue
+            node_type = attr[len("visit_"):]
+            if node_type == "Constant":
+                keys = [f"Constant.{legacy}" for legacy in set(CONSTANT_VISITOR_NAMES.values())]
+                keys.append("Constant.")
+            elif node_type in CONSTANT_VISITOR_NAMES.values():
+                if cls.visit_Constant is not ast.NodeVisitor.visit_Constant:
+                    continue
+                keys = [f"Constant.{node_type}"]
+            else:
+                keys = [node_type]
+            for key in keys:
+                table.setdefault(key, []).append((i, attr))
+    for entries in table.values():
+        entries.sort()
+    return table
+
+
+class FusedVisitor:
+    """Runs several checkers over a tree in a single pre-order walk.
+
+    Every checker visit method does its work and then calls self.generic_visit(node),
+    so visiting each node once for all interested checkers, parent before children,
+    gives each checker the same sequence of calls as walking the tree on its own.
+    """
+
+    def __init__(
+        self, checkers: List[Checker], records: Optional[List[CheckerRecord]] = None
+    ):
+        table = dispatch_table(tuple(type(checker) for checker in checkers))
+        if records is None:
+            self.handlers = {
+                key: [getattr(checkers[i], attr) for i, attr in entries]
+                for key, entries in table.items()
+            }
+        else:
+            self.handlers = {
+                key: [
+                    timed(getattr(checkers[i], attr), records[i]) for i, attr in entries
+                ]
+                for key, entries in table.items()
+            }
+        for checker in checkers:
+            checker._fused = True
+
+    def visit(self, tree: ast.AST):
+        handlers = self.handlers
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            key = type(node).__name__
+            if key == "Constant":
+                key = "Constant." + CONSTANT_VISITOR_NAMES.get(type(node.value), "")
+            for handler in handlers.get(key, ()):
+                handler(node)
+            stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+
+def timed(handler, record: CheckerRecord):
+    """Wrap a visit method so its calls are counted and timed in `record`."""
+
+    def call(node):
+        start = time.perf_counter()
+        handler(node)
+        record.visit += time.perf_counter() - start
+        record.nodes += 1
+
+    return call
+
+
+@lru_cache(maxsize=None)
+def checker_set_version(checkers: Tuple[Type[Checker], ...]) -> str:
+    """Fingerprint a checker set so cached analyses are invalidated when any checker changes."""
+    h = hashlib.sha256()
+    for cls in checkers:
+        h.update(f"{cls.__module__}.{cls.__qualname__}\0".encode())
+        try:
+            h.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            pass
+    return h.hexdigest()
+
+
+# set by enable_profiling; checkers are timed only while it is not None
+checker_stats: Optional[CheckerStats] = None
+
+
+def enable_profiling(dump_path: Optional[str] = None) -> CheckerStats:
+    """Start recording per-checker timings and hit counts, optionally dumped as JSON at exit."""
+    global checker_stats
+    if checker_stats is None:
+        checker_stats = CheckerStats()
+    if dump_path:
+        checker_stats.dump_at_exit(dump_path)
+    return checker_stats
+
+
+def check_problem(name: str, func_code: str) -> List[Comment]:
+    """Run the checkers for problem `name`, with line numbers relative to `func_code`."""
+    load_pack()
+    if checker_stats is not None:
+        return profile_problem(name, func_code, checker_stats)
+
+    comments = []
+
+    tree = ast.parse(func_code)
+    source = SourceText(func_code)
+    checkers = [
+        checker(source)
+        for checker in CHECKERS + TARGETED_CHECKERS.get(name, [])
+    ]
+    FusedVisitor(checkers).visit(tree)
+    for checker in checkers:
+        comments.extend(checker.comments())
+
+    comments.sort(key=lambda x: x.line_num)
+    return comments
+
+
+def profile_problem(name: str, func_code: str, stats: CheckerStats) -> List[Comment]:
+    """check_problem, recording the cost and output of each checker in `stats`."""
+    comments = []
+
+    tree = ast.parse(func_code)
+    source = SourceText(func_code)
+    classes = CHECKERS + TARGETED_CHECKERS.get(name, [])
+    records = [CheckerRecord() for _ in classes]
+    checkers = []
+    for checker, record in zip(classes, records):
+        start = time.perf_counter()
+        checkers.append(checker(source))
+        record.construct = time.perf_counter() - start
+    FusedVisitor(checkers, records).visit(tree)
+    for checker, record in zip(checkers, records):
+        start = time.perf_counter()
+        found = list(checker.comments())
+        record.comments_time = time.perf_counter() - start
+        record.comments = len(found)
+        record.runs = 1
+        comments.extend(found)
+        stats.add(name, checker_label(type(checker)), record)
+
+    comments.sort(key=lambda x: x.line_num)
+    return comments
+
+
+# "class X" / "def y" markers, which the ast locator resolves to the definitions themselves
+DEFINITION_MARKER = re.compile(r"(class|def) (\w+)")
+
+
+def find_markers(code: str, markers) -> Dict[str, int]:
+    """Return the offset of the first occurrence of each distinct marker in `code`."""
+    return {marker: code.index(marker) for marker in set(markers)}
+
+
+def find_definitions(tree: ast.AST) -> Dict[str, ast.AST]:
+    """Map "class X" / "def y" to the first definition with that name in `tree`.
+
+    Definitions can only appear in statement lists, so expressions are never walked.
+    """
+    found = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.ClassDef):
+            marker = f"class {node.name}"
+        elif isinstance(node, ast.FunctionDef):
+            marker = f"def {node.name}"
+        else:
+            marker = None
+        if marker and (
+            marker not in found
+            or (node.lineno, node.col_offset)
+            < (found[marker].lineno, found[marker].col_offset)
+        ):
+            found[marker] = node
+        for field in ("body", "orelse", "handlers", "finalbody"):
+            stack.extend(getattr(node, field, ()))
+    return found
+
+
+analysis_cache = AnalysisCache()
+
+# ANALYZER_PROFILE=<file> profiles every checker run and writes the stats to <file> at exit
+if os.environ.get("ANALYZER_PROFILE"):
+    enable_profiling(os.environ["ANALYZER_PROFILE"])
+
+
+def get_problems(
+    code: str,
+    cache: Optional[AnalysisCache] = analysis_cache,
+    mode: str = "text",
+    previous: Optional[Dict[str, Problem]] = None,
+):
+    """Split `code` into PROBLEMS and run the checkers on each.
+
+    In "text" mode each problem spans from the first occurrence of its start marker
+    to the first occurrence of its end marker. In "ast" mode the file is parsed once
+    and "class X" / "def y" markers resolve to the actual definitions, never to text
+    in comments or strings; other markers are still found textually. Files that
+    don't parse fall back to "text" mode.
+
+    `previous` is the result of get_problems for an earlier revision of the same
+    file. Problems whose code is unchanged reuse its comments, moved to the
+    problem's new position, so only the problems a revision touched are analyzed.
+    """
+    load_pack()
     out = {}
+    source = SourceText(code)
+    markers = [marker for span in PROBLEMS.values() for marker in span]
+
+    tree = None
+    if mode == "ast":
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            pass
+    if tree is None:
+        offsets = find_markers(code, markers)
+    else:
+        definitions = find_definitions(tree)
+        offsets = {}
+        for marker in set(markers):
+            node = definitions.get(marker) if DEFINITION_MARKER.fullmatch(marker) else None
+            if node is None:
+                offsets[marker] = code.index(marker)
+            else:
+                offsets[marker] = source.position_offset(node.lineno, node.col_offset)
+
     for name, (start, end) in PROBLEMS.items():
-        start_index = code.index(start)
-        end_index = code.index(end)
-        initial_line_number = code[:start_index].count("\n") + 1
+        start_index = offsets[start]
+        end_index = offsets[end]
+        initial_line_number = source.offset_line(start_index)
         func_code = code[start_index:end_index].strip()
 
-        comments = []
-
-        tree = ast.parse(func_code)
-        for checker in CHECKERS + TARGETED_CHECKERS.get(name, []):
-            checker = checker(func_code)
-            checker.visit(tree)
-            for comment in checker.comments():
-                comments.append(
-                    Comment(
-                        comment.line_num + initial_line_number - 1,
-                        comment.comment,
-                        comment.fields,
-                    )
-                )
+        before = previous.get(name) if previous else None
+        if before is not None and before.code == func_code:
+            shift = initial_line_number - before.initial_line_number
+            comments = [
+                comment._replace(line_num=comment.line_num + shift)
+                for comment in before.comments
+            ]
+            out[name] = Problem(func_code, initial_line_number, comments)
+            continue
+
+        if cache is None:
+            found = check_problem(name, func_code)
+        else:
+            version = checker_set_version(
+                tuple(CHECKERS + TARGETED_CHECKERS.get(name, []))
+            )
+            key = cache.key(name, func_code, version)
+            found = cache.get(key)
+            if found is None:
+                found = check_problem(name, func_code)
+                cache.put(key, found)
 
-        comments.sort(key=lambda x: x.line_num)
+        comments = [
+            Comment(line_num + initial_line_number - 1, comment, tuple(fields))
+            for line_num, comment, fields in found
+        ]
 
         out[name] = Problem(func_code, initial_line_number, comments)
     return out
@@ -149,7 +499,7 @@ class MeaningfulVariableNameChecker(Checker):
                 var.line_num,
                 f"The name `{name}` is not descriptive and makes the code more difficult for somebody else to "
                 f"understand. Using names like `{{alternative}}` would clarify what the name represents.",
-                ["alternative"],
+                ("alternative",),
             )
 
     def visit_Name(self, node):
@@ -163,30 +513,6 @@ class MeaningfulVariableNameChecker(Checker):
         self.generic_visit(node)
 
 
-@question_checker("roll_dice")
-class MultipleLoopChecker(Checker):
-    def __init__(self, code):
-        self.loop_cnt = 0
-
-    def comments(self):
-        if self.loop_cnt > 1:
-            yield Comment(
-                0,
-                "Having multiple loops makes the code more complicated than it should be. "
-                "Instead, the code could have a boolean flag that becomes true when a call to `dice()` is 1. "
-                "At the end, return the total of outcomes or 1 depending on the boolean flag after the loop. "
-                "By keeping the behavior similar to both pig out and non pig out cases, the code is greatly simplified.",
-            )
-
-    def visit_While(self, node):
-        self.loop_cnt += 1
-        self.generic_visit(node)
-
-    def visit_For(self, node):
-        self.loop_cnt += 1
-        self.generic_visit(node)
-
-
 @checker
 class AugmentedAssignmentChecker(Checker):
     def __init__(self, code):
@@ -219,7 +545,7 @@ class AugmentedAssignmentChecker(Checker):
             elif isinstance(op, ast.Pow):
                 op = "**"
             if isinstance(op, str):
-                full_line = self.code.split("\n")[node.lineno - 1].strip()
+                full_line = self.code.line(node.lineno).strip()
                 lhs, rhs = full_line.split("=", 1)
                 lhs_repeat, real_rhs = rhs.split(op)
                 self._comments.append(
@@ -251,7 +577,7 @@ class BuiltinShadowingChecker(Checker):
                 f"(which is why it appears in a different color in most text editors). "
                 f"When assigning a value to `{name}`, the code is actually overriding builtin Python functionality, "
                 f"which could lead to trouble sometimes! A different name you can use is `{{alternative}}`.",
-                ["alternative"],
+                ("alternative",),
             )
 
     def visit_Name(self, node):
@@ -283,7 +609,7 @@ class UnnecessaryBooleanComparison(Checker):
                 is_truthy = isinstance(op, (ast.NotEq, ast.IsNot)) != (
                     right.value is True
                 )
-                full_line = self.code.split("\n")[node.lineno - 1].strip()
+                full_line = self.code.line(node.lineno).strip()
                 if isinstance(op, ast.Eq):
                     op = "=="
                 elif isinstance(op, ast.NotEq):
@@ -329,7 +655,7 @@ class ThisInVariableNameChecker(Checker):
                 f"`{{alternative}}` since it carrries the same semantic value. In languages other than Python, the term "
                 f"`this` has different meaning which might confuse people who might not be as familiar with Python but "
                 f"are still trying to understand the code.",
-                ["alternative"],
+                ("alternative",),
             )
 
     def visit_Name(self, node):
@@ -358,7 +684,7 @@ class LongVariableNameChecker(Checker):
                 f"Let's try to convey the same message in fewer characters because, the longer a name is, the more "
                 f"time a programmer needs to spend parsing and understanding its role in the function. For example, "
                 f"we can simplify `{name}` to just `{{alternative}}`.",
-                ["alternative"],
+                ("alternative",),
             )
 
     def visit_Name(self, node):
@@ -432,195 +758,3 @@ class CamelCaseVariableNamingChecker(Checker):
             var.line_num = min(var.line_num, node.lineno)
         self.generic_visit(node)
 
-
-@question_checker("ThrowerAnt")
-class WrongMaxRangeChecker(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_Assign(self, node):
-        targets, value = node.targets, node.value
-        if (
-            len(targets) == 1
-            and isinstance(targets[0], ast.Name)
-            and targets[0].id == "max_range"
-            and isinstance(value, ast.Num)
-            and value.n < 10000
-        ):
-            self._comments.append(
-                Comment(
-                    node.lineno,
-                    f"The code uses the magic number {value.n} here as the `max_range` which might cause problems in "
-                    f"the future, because if we ever increased the board size, the `ThrowerAnt` would be unable to "
-                    f"attack bees further than {value.n} places away. Try using `float('inf')` (infinity) instead.",
-                )
-            )
-        self.generic_visit(node)
-
-
-@question_checker("ThrowerAnt")
-class WrongMaxRangeChecker(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_Assign(self, node):
-        targets, value = node.targets, node.value
-        if (
-            len(targets) == 1
-            and isinstance(targets[0], ast.Name)
-            and targets[0].id == "max_range"
-            and isinstance(value, ast.Num)
-            and value.n < 10000
-        ):
-            self._comments.append(
-                Comment(
-                    node.lineno,
-                    f"The code uses the magic number {value.n} here as the `max_range` which might cause problems in "
-                    f"the future, because if we ever increased the board size, the `ThrowerAnt` would be unable to "
-                    f"attack bees further than {value.n} places away. Try using `float('inf')` (infinity) instead.",
-                )
-            )
-        self.generic_visit(node)
-
-
-@question_checker("ThrowerAnt")
-class HiveEqualityNotIdentityChecker(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_Compare(self, node):
-        if len(node.ops) == 1:
-            left = node.left
-            op = node.ops[0]
-            right = node.comparators[0]
-            if (
-                (isinstance(left, ast.Name) and left.id == "hive")
-                or (isinstance(right, ast.Name) and right.id == "hive")
-            ) and not isinstance(op, ast.IsNot):
-                self._comments.append(
-                    Comment(
-                        node.lineno,
-                        "Notice that we pass a `hive` instance directly to this method so we should use "
-                        "Python's `is not` here to test identity. The code also works when using `!=` "
-                        "but since there's only one specific `hive`, checking for identity here makes a "
-                        "little more sense since the `Place` class doesn't define an equality method.",
-                    )
-                )
-        self.generic_visit(node)
-
-
-@question_checker("ThrowerAnt")
-class HiveEqualityNotIdentityChecker(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_Str(self, node):
-        if node.s == "Hive":
-            self._comments.append(
-                Comment(
-                    node.lineno,
-                    "The code should not be checking if the name of the place is 'Hive'. The "
-                    "abstraction barrier is being violated! This is why one of the parameters is "
-                    "`hive`. This is a pointer to the Hive instance and can be used to check if the "
-                    "current place is the hive. So `{place-var-name}.name != 'Hive'` should be "
-                    "`{place-var-name} is not hive`.",
-                    ["place-var-name"],
-                )
-            )
-        self.generic_visit(node)
-
-
-@question_checker("Short and LongThrowers")
-class RedefinedNearestBeeChecker(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_FunctionDef(self, node):
-        if node.name == "nearest_bee":
-            self._comments.append(
-                Comment(
-                    node.lineno,
-                    f"Instead of repeating all the code for `nearest_bee` for both `ShortThrower` and `LongThrower`, "
-                    f"using the regular `ThrowerAnt`'s `nearest_bee` function would reduce the amount of code needed "
-                    f"significantly. The point of classes is that you can generalize one function to do the tasks of "
-                    f"many functions with minimal code changes.",
-                )
-            )
-        elif node.name == "__init__":
-            self._comments.append(
-                Comment(
-                    node.lineno,
-                    f"An `__init__` method that simply calls it's base class's `__init__` is unnecessary because "
-                    f"inheritance will do this automatically without this method in `LongThrower` and `ShortThrower`.",
-                )
-            )
-        self.generic_visit(node)
-
-
-@question_checker("FireAnt")
-class NoCallClassReduceArmor(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_AugAssign(self, node):
-        if isinstance(node.op, ast.Sub):
-            if isinstance(node.value, ast.Name) and node.value.id == "amount":
-                self._comments.append(
-                    Comment(
-                        node.lineno,
-                        f"The `Ant.reduce_armor` method already takes care of removing an insect if its armor drops to "
-                        f"0 or below, so we could take advantage of that by calling `Ant.reduce_armor(self, amount)` "
-                        f"rather than duplicating the logic here. In addition, it would allow further modularity if "
-                        f"we wanted to modify the `reduce_armor` method; instead of changing the code in many place, "
-                        f"changing it in one place may suffice.",
-                    )
-                )
-            else:
-                self._comments.append(
-                    Comment(
-                        node.lineno,
-                        f"Consider calling the `Bee.reduce_armour` method rather than trying to manually reimplement "
-                        f"it here, since this will duplicate logic already written elsewhere. In addition, it would "
-                        f"allow further modularity if we wanted to modify the `reduce_armor` method; instead of "
-                        f"changing the code in many place, changing it in one place may suffice.",
-                    )
-                )
-        self.generic_visit(node)
-
-
-@question_checker("BodyguardAnt - Place")
-class ExtraAttributeAccessChecker(Checker):
-    def __init__(self, code):
-        self._comments = []
-
-    def comments(self):
-        yield from self._comments
-
-    def visit_Attribute(self, node):
-        if node.attr == "is_container":
-            self._comments.append(
-                Comment(
-                    node.lineno,
-                    f"Checking for `insect.is_container` or `self.ant.is_container` is redundant as it is handled by "
-                    f"the `can_contain` method.",
-                )
-            )
-        self.generic_visit(node)
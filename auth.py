@@ -2,12 +2,12 @@
 Bacon OK integration: mostly ported from OK Client
 https://github.com/okpy/ok-client/blob/master/client/utils/auth.py
 """
-import http.server
+import json
 import logging
-import requests
+import os
 import sys
+import threading
 import time
-import webbrowser
 from urllib.parse import parse_qsl, urlencode, urlparse
 
 log = logging.getLogger(__name__)
@@ -26,16 +26,29 @@ REDIRECT_PORT = 6265
 # OAuth post timeout
 TIMEOUT = 10
 
-# Server/API config
-OK_SERVER_URL = "https://okpy.org"
+# Server/API config; set OK_SERVER_URL to use another server, e.g. ok_standin.py
+DEFAULT_SERVER_URL = "https://okpy.org"
+OK_SERVER_URL = os.environ.get("OK_SERVER_URL", DEFAULT_SERVER_URL).rstrip("/")
 INFO_ENDPOINT = "/api/v3/user/"
 ASSIGNMENT_ENDPOINT = "/api/v3/assignment/"
 AUTH_ENDPOINT = "/oauth/authorize"
 TOKEN_ENDPOINT = "/oauth/token"
 ERROR_ENDPOINT = "/oauth/errors"
 
+# Where tokens are kept between launches; per user, never in a shared grading directory
+TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".composition-assistant-token")
+if OK_SERVER_URL != DEFAULT_SERVER_URL:
+    # never let another server refresh (and so overwrite) the okpy token
+    TOKEN_FILE += "-" + urlparse(OK_SERVER_URL).netloc.replace(":", "-")
+
+# Refresh this many seconds before the access token expires
+REFRESH_MARGIN = 3600
+
+# Seconds to wait before retrying a failed background refresh
+REFRESH_RETRY = 60
+
 # URL to redirect user to upon OAuth success
-SUCCESS_ENDPOINT_URL = "https://okpy.org"  # temporary
+SUCCESS_ENDPOINT_URL = OK_SERVER_URL  # temporary
 
 
 class BaconOkException(Exception):
@@ -79,6 +92,8 @@ def _make_token_post(server, data):
     """Try getting an access token from the server. If successful, returns the
     JSON response. If unsuccessful, raises an OAuthException.
     """
+    import requests  # deferred: only needed once a token is exchanged
+
     try:
         response = requests.post(server + TOKEN_ENDPOINT, data=data, timeout=TIMEOUT)
         body = response.json()
@@ -119,6 +134,8 @@ def _make_refresh_post(server, refresh_token):
 
 def _get_code():
     """ Make the requests to get OK access code """
+    import webbrowser
+
     # email = input("Please enter your bCourses email: ")
 
     host_name = REDIRECT_HOST
@@ -154,6 +171,8 @@ def _get_code():
 
 def _get_code_via_browser(redirect_uri, host_name, port_number):
     """ Get OK access code by opening User's browser """
+    import http.server
+
     server = OK_SERVER_URL
     code_response = None
     oauth_exception = None
@@ -213,6 +232,36 @@ def _get_code_via_browser(redirect_uri, host_name, port_number):
     return code_response
 
 
+class TokenStore:
+    """ File-backed session config for OAuthSession, private to the user """
+
+    def __init__(self, path=TOKEN_FILE):
+        self.path = path
+        self._config = {}
+        try:
+            with open(path) as f:
+                self._config = json.load(f)
+        except (OSError, ValueError):
+            log.info("No stored token at {}".format(path))
+
+    def config(self):
+        return self._config
+
+    def save(self):
+        """ Atomically replace the token file, readable only by its owner """
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._config, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
 class OAuthSession:
     """ Represents OK OAuth state """
 
@@ -236,6 +285,8 @@ class OAuthSession:
             self.access_token = str(access_token)
             self.refresh_token = str(refresh_token)
             self.expires_at = expires_at
+        self._refresh_lock = threading.Lock()
+        self._refresher = None
 
     def _dump(self):
         """ Dump state to a Bacon session """
@@ -249,13 +300,19 @@ class OAuthSession:
                 config["ok_expires_at"] = str(self.expires_at)
             if self.assignment:
                 config["ok_last_download_assignment"] = self.assignment
+            if hasattr(self.session, "save"):
+                self.session.save()
 
     def refresh(self):
         """ Refreshes a token """
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
         if not self.refresh_token:
             return False
         cur_time = int(time.time())
-        if cur_time < self.expires_at - 3600:
+        if cur_time < self.expires_at - REFRESH_MARGIN:
             # expires in 1 hour
             return True
         self.access_token, expires_in, self.refresh_token = _make_refresh_post(
@@ -307,3 +364,25 @@ class OAuthSession:
             self.expires_at = cur_time + expires_in
             self._dump()
         return self.access_token
+
+    def start_refresher(self):
+        """
+        Keep the access token fresh from a daemon thread, refreshing it
+        REFRESH_MARGIN seconds before it expires so that no API call has
+        to wait for a refresh
+        """
+        if self._refresher is None and self.refresh_token:
+            self._refresher = threading.Thread(
+                target=self._refresh_forever, name="oauth-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_forever(self):
+        while True:
+            time.sleep(max(self.expires_at - REFRESH_MARGIN - time.time(), 0))
+            try:
+                if self.refresh():
+                    continue
+            except OAuthException:
+                log.warning("Background token refresh failed", exc_info=True)
+            time.sleep(REFRESH_RETRY)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+CACHE_DIR = ".backup_cache"
+# bytes of backup data kept on disk before the least recently used backups are evicted
+MAX_CACHE_SIZE = 256 * 1024 * 1024
+
+
+def code_from_messages(messages):
+    """Return the contents of the project file from a backup's messages."""
+    out = None
+    for message in messages:
+        #TODO: Change references to <proj>.py when the project changes
+        if "ants.py" in message["contents"]:
+            if out is not None:
+                raise Exception("Multiple ants.py found???")
+            out = message["contents"]["ants.py"]
+
+    if out is None:
+        raise Exception("No ants.py found!!!")
+
+    return out
+
+
+def write_atomic(path, data):
+    """Replace the file at `path` with the bytes `data`, so readers never see it half written."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class BackupCache:
+    """Content-addressed on-disk cache of backup messages fetched from okpy.
+
+    Every file in a backup is stored once under blobs/<sha256>, and each backup id
+    has a manifest under backups/<id>.json mapping its messages' file names to
+    blob hashes. Reading a backup refreshes its manifest's mtime, which orders
+    eviction once the cache grows past `max_size` bytes.
+
+    Arguments:
+    directory -- where the cache lives (default ".backup_cache")
+    max_size -- size cap in bytes (default 256 MiB)
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_size=MAX_CACHE_SIZE):
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.manifest_dir = os.path.join(directory, "backups")
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # the directories are made by the first put, so importing never writes to disk
+        self._made_dirs = False
+
+    def _manifest_path(self, id):
+        return os.path.join(self.manifest_dir, f"{id}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest)
+
+    def ids(self):
+        """Return the ids of all cached backups."""
+        try:
+            names = os.listdir(self.manifest_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[: -len(".json")] for name in names if name.endswith(".json"))
+
+    def get(self, id):
+        """Return the cached messages of backup `id`, or None if it isn't cached."""
+        path = self._manifest_path(id)
+        with self._lock:
+            try:
+                with open(path) as f:
+                    manifest = json.load(f)
+                messages = [
+                    {"contents": {name: self._read_blob(digest) for name, digest in files.items()}}
+                    for files in manifest
+                ]
+            except (OSError, ValueError):
+                return None
+            os.utime(path)
+        return messages
+
+    def put(self, id, messages):
+        """Store the file contents of backup `id`'s messages and evict old backups if needed."""
+        manifest = []
+        with self._lock:
+            if not self._made_dirs:
+                os.makedirs(self.blob_dir, exist_ok=True)
+                os.makedirs(self.manifest_dir, exist_ok=True)
+                self._made_dirs = True
+            for message in messages:
+                files = {}
+                for name, text in message["contents"].items():
+                    if isinstance(text, str):
+                        files[name] = self._write_blob(text.encode())
+                manifest.append(files)
+            write_atomic(self._manifest_path(id), json.dumps(manifest).encode())
+            self._evict()
+
+    def _read_blob(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"corrupt cache blob {digest}")
+        return data.decode()
+
+    def _write_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            write_atomic(path, data)
+        return digest
+
+    def _evict(self):
+        manifests = [entry for entry in os.scandir(self.manifest_dir) if entry.is_file()]
+        blobs = {entry.name: entry.stat().st_size for entry in os.scandir(self.blob_dir)}
+        size = sum(blobs.values()) + sum(entry.stat().st_size for entry in manifests)
+        if size <= self.max_size:
+            return
+
+        references = {}
+        refcounts = {}
+        for entry in manifests:
+            with open(entry.path) as f:
+                references[entry.path] = {d for files in json.load(f) for d in files.values()}
+            for digest in references[entry.path]:
+                refcounts[digest] = refcounts.get(digest, 0) + 1
+
+        manifests.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in manifests:
+            if size <= self.max_size:
+                break
+            size -= entry.stat().st_size
+            os.unlink(entry.path)
+            for digest in references[entry.path]:
+                refcounts[digest] -= 1
+                if not refcounts[digest] and digest in blobs:
+                    size -= blobs.pop(digest)
+                    os.unlink(self._blob_path(digest))
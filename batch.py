@@ -0,0 +1,180 @@
+"""Headless analysis of many submissions, streamed as NDJSON.
+
+Usage: python3 batch.py PATH [PATH ...] > suggestions.ndjson
+
+Each PATH is a project file, a directory of project files (named by backup id),
+or a backup cache directory such as .backup_cache.
+"""
+import argparse
+import json
+import os
+import sys
+import traceback
+from collections import deque
+from functools import partial
+from itertools import islice
+from typing import NamedTuple
+
+from analyzer import analysis_cache, enable_profiling, get_problems
+from backup_cache import BackupCache, code_from_messages
+
+# submissions sent to a worker process at a time
+CHUNK_SIZE = 16
+# chunks queued or running per worker process; later chunks aren't read until these are written
+CHUNKS_PER_WORKER = 2
+
+
+class Submission(NamedTuple):
+    id: str
+    # a project file, or the backup cache directory holding the submission
+    path: str
+    cached: bool = False
+
+    def load(self):
+        if self.cached:
+            return code_from_messages(BackupCache(self.path).get(self.id))
+        with open(self.path) as f:
+            return f.read()
+
+
+def iter_submissions(paths):
+    """Yield a Submission for every submission under `paths`, without reading them."""
+    for path in paths:
+        if os.path.isdir(os.path.join(path, "backups")):
+            for id in BackupCache(path).ids():
+                yield Submission(id, path, cached=True)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".py"):
+                    yield Submission(os.path.splitext(name)[0], os.path.join(path, name))
+        else:
+            yield Submission(os.path.splitext(os.path.basename(path))[0], path)
+
+
+def analyze_submission(submission, mode="text"):
+    """Return the NDJSON records for one submission.
+
+    A submission that can't be loaded or analyzed yields a single error record.
+    """
+    id = submission.id
+    try:
+        problems = get_problems(submission.load(), mode=mode)
+    except Exception as e:
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        return [{"backup": id, "error": error}]
+    return [
+        {
+            "backup": id,
+            "problem": name,
+            "line": comment.line_num,
+            "comment": comment.comment,
+            "fields": list(comment.fields),
+        }
+        for name, problem in problems.items()
+        for comment in problem.comments
+    ]
+
+
+def analyze_chunk(submissions, mode="text"):
+    return [analyze_submission(submission, mode) for submission in submissions]
+
+
+def write_records(records, out):
+    for record in records:
+        out.write(json.dumps(record) + "\n")
+    out.flush()
+
+
+def init_worker(analysis_cache_dir):
+    if analysis_cache_dir:
+        analysis_cache.persist(analysis_cache_dir)
+
+
+def analyze(paths, out=sys.stdout, mode="text", jobs=1, chunk_size=CHUNK_SIZE):
+    """Analyze every submission under `paths`, writing results to `out` as they are produced.
+
+    With more than one job, submissions are analyzed in chunks across a process
+    pool; results are still written in the same order as a serial run. Only a
+    few chunks per worker are in flight at once, so memory use stays bounded
+    however many submissions there are, even when an early chunk is slow.
+    """
+    submissions = iter_submissions(paths)
+    analyze_one = partial(analyze_submission, mode=mode)
+    if jobs == 1:
+        for submission in submissions:
+            write_records(analyze_one(submission), out)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(analysis_cache.directory,),
+    ) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < jobs * CHUNKS_PER_WORKER:
+                chunk = list(islice(submissions, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(analyze_chunk, chunk, mode))
+            if not pending:
+                return
+            for records in pending.popleft().result():
+                write_records(records, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyze submissions without grading them, writing NDJSON suggestions"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="project files, directories of project files, or backup cache directories",
+    )
+    parser.add_argument(
+        "-o", "--output", help="file to write NDJSON to (default: standard output)"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["text", "ast"],
+        default="text",
+        help="how problem markers are located (see analyzer.get_problems)",
+    )
+    parser.add_argument(
+        "--analysis-cache",
+        metavar="DIR",
+        help="also keep analyzer results in DIR so they are reused across runs",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes, or 0 for one per CPU (default 1)",
+    )
+    parser.add_argument(
+        "--profile-checkers",
+        metavar="FILE",
+        help="time every checker and write per-checker stats to FILE as JSON (needs -j 1)",
+    )
+    args = parser.parse_args()
+    if args.analysis_cache:
+        analysis_cache.persist(args.analysis_cache)
+    jobs = args.jobs or os.cpu_count()
+    if args.profile_checkers:
+        # worker processes never run exit handlers, so their stats would be lost
+        if jobs != 1:
+            parser.error("--profile-checkers only works with -j 1")
+        enable_profiling(args.profile_checkers)
+    if args.output:
+        with open(args.output, "w") as out:
+            analyze(args.paths, out, args.mode, jobs)
+    else:
+        analyze(args.paths, sys.stdout, args.mode, jobs)
+
+
+if __name__ == "__main__":
+    main()
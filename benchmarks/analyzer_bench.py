@@ -0,0 +1,429 @@
+"""Micro-benchmarks for analyzer.get_problems and the individual checkers.
+
+Analyzes a synthetic corpus of ants.py submissions that vary in size and style
+and reports microseconds per submission for:
+
+- each checker run on its own over every problem it applies to,
+- each problem (parse + all of its checkers, no memoization),
+- get_problems end to end, cold (empty analysis cache) and warm (cache filled).
+
+Usage: python3 benchmarks/analyzer_bench.py [--submissions N] [--json FILE] [--baseline FILE]
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer  # noqa: E402
+from analysis_cache import AnalysisCache  # noqa: E402
+
+# a result more than this much slower than the baseline is reported as a regression
+TOLERANCE = 1.25
+
+SKELETON = '''"""CS 61A presents Ants Vs. SomeBees."""
+
+import random
+
+
+class Place(object):
+    """A Place holds insects and has an exit to another Place."""
+
+    def __init__(self, name, exit=None):
+        self.name = name
+        self.exit = exit
+        self.bees = []
+        self.ant = None
+        self.entrance = None
+        if exit is not None:
+            exit.entrance = self
+
+    def add_insect(self, insect):
+        """Add an Insect to this Place."""
+        if insect.is_ant:
+            if self.ant is None:
+                self.ant = insect
+            else:
+{add_insect}
+        else:
+            self.bees.append(insect)
+        insect.place = self
+
+    def remove_insect(self, insect):
+        if insect.is_ant:
+            self.ant = None
+        else:
+            self.bees.remove(insect)
+        insect.place = None
+
+{filler}
+
+class Insect(object):
+    is_ant = False
+    damage = 0
+
+    def __init__(self, armor, place=None):
+        self.armor = armor
+        self.place = place
+
+    def reduce_armor(self, amount):
+        self.armor -= amount
+        if self.armor <= 0:
+            self.place.remove_insect(self)
+
+
+class Ant(Insect):
+    is_ant = True
+    implemented = False
+    food_cost = 0
+    is_container = False
+
+    def __init__(self, armor=1):
+        Insect.__init__(self, armor)
+
+    def can_contain(self, other):
+        return False
+
+
+class ThrowerAnt(Ant):
+    """ThrowerAnt throws a leaf each turn at the nearest Bee in its range."""
+
+    name = 'Thrower'
+    implemented = True
+    damage = 1
+    food_cost = 3
+    min_range = 0
+    max_range = {max_range}
+
+    def nearest_bee(self, hive):
+        """Return the nearest Bee in a Place that is not the HIVE."""
+{nearest_bee}
+
+    def throw_at(self, target):
+        if target is not None:
+            target.reduce_armor(self.damage)
+
+
+def random_or_none(s):
+    if s:
+        return random.choice(s)
+
+
+class ShortThrower(ThrowerAnt):
+    name = 'Short'
+    food_cost = 2
+    max_range = 3
+    implemented = True
+{short_init}
+
+class LongThrower(ThrowerAnt):
+    name = 'Long'
+    food_cost = 2
+    min_range = 5
+    implemented = True
+{long_nearest}
+
+class FireAnt(Ant):
+    name = 'Fire'
+    damage = 3
+    food_cost = 5
+    implemented = True
+
+    def __init__(self, armor=3):
+        Ant.__init__(self, armor)
+
+    def reduce_armor(self, amount):
+{fire_reduce}
+
+
+class HungryAnt(Ant):
+    name = 'Hungry'
+
+
+class BodyguardAnt(Ant):
+    name = 'Bodyguard'
+    food_cost = 4
+    is_container = True
+    implemented = True
+
+    def __init__(self, armor=2):
+        Ant.__init__(self, armor)
+        self.contained_ant = None
+
+    def can_contain(self, other):
+{can_contain}
+
+    def contain_ant(self, ant):
+        self.contained_ant = ant
+{extra_methods}
+
+class TankAnt(BodyguardAnt):
+    name = 'Tank'
+    damage = 1
+'''
+
+NAMES = {
+    "snake": ("place", "distance", "bee_list"),
+    "camel": ("currentPlace", "distanceTravelled", "beeList"),
+    "short": ("p", "d", "bl"),
+    "verbose": ("this_place_being_checked", "distance_from_the_thrower", "list_of_bees"),
+}
+
+
+def indent(lines, level):
+    return "\n".join(" " * (4 * level) + line for line in lines)
+
+
+def generate_submission(rng, size):
+    """Return one synthetic ants.py; `size` scales the amount of filler and extra methods."""
+    place, dist, bees = NAMES[rng.choice(list(NAMES))]
+    hive_check = rng.choice(
+        [f"{place} is not hive", f"{place} != hive", f"{place}.name != 'Hive'"]
+    )
+    step = rng.choice([f"{dist} = {dist} + 1", f"{dist} += 1"])
+    nearest_bee = [
+        f"{place} = self.place",
+        f"{dist} = 0",
+        f"while {hive_check}:",
+        f"    if {place}.bees and self.min_range <= {dist} <= self.max_range:",
+        f"        return random_or_none({place}.bees)",
+        f"    {place} = {place}.entrance",
+        f"    {step}",
+        "return None",
+    ]
+    if rng.random() < 0.5:
+        long_nearest = indent(
+            [
+                "",
+                "def nearest_bee(self, hive):",
+                f"    {place} = self.place",
+                f"    for i in range({rng.choice(['0, ', ''])}10):",
+                f"        if {place}.bees == [] or {place} == hive:",
+                f"            {place} = {place}.entrance",
+                f"    return random_or_none({place}.bees)",
+            ],
+            1,
+        )
+    else:
+        long_nearest = ""
+    short_init = ""
+    if rng.random() < 0.5:
+        short_init = indent(
+            ["", "def __init__(self, armor=1):", "    ThrowerAnt.__init__(self, armor)"], 1
+        )
+    fire_reduce = rng.choice(
+        [
+            [
+                "self.armor -= amount",
+                "if self.armor <= 0:",
+                f"    for bee in list(self.place.bees):",
+                "        bee.armor -= self.damage",
+                "        if bee.armor <= 0:",
+                "            self.place.remove_insect(bee)",
+                "    self.place.remove_insect(self)",
+            ],
+            [
+                f"{bees} = list(self.place.bees)",
+                "if self.armor <= amount:",
+                f"    for bee in {bees}:",
+                "        bee.reduce_armor(self.damage)",
+                "Ant.reduce_armor(self, amount)",
+            ],
+        ]
+    )
+    can_contain = rng.choice(
+        [
+            ["return self.contained_ant is None and not other.is_container"],
+            [
+                "if self.contained_ant == None and other.is_container == False:",
+                "    return True",
+                "else:",
+                "    return False",
+            ],
+        ]
+    )
+    add_insect = rng.choice(
+        [
+            [
+                "if self.ant.can_contain(insect):",
+                "    self.ant.contain_ant(insect)",
+                "elif insect.can_contain(self.ant):",
+                "    insect.contain_ant(self.ant)",
+                "    self.ant = insect",
+                "else:",
+                "    assert self.ant is None, 'Two ants in {0}'.format(self)",
+            ],
+            [
+                "if self.ant.is_container == True and self.ant.can_contain(insect):",
+                "    self.ant.contain_ant(insect)",
+                "elif insect.is_container and insect.can_contain(self.ant):",
+                "    insect.contain_ant(self.ant)",
+                "    self.ant = insect",
+                "else:",
+                "    assert False, 'Two ants in {0}'.format(self)",
+            ],
+        ]
+    )
+    filler = []
+    for i in range(size * 4):
+        filler += [
+            f"def helper_{i}(colony, amount):",
+            f"    total = 0",
+            f"    for k in range(amount):",
+            f"        total = total + k * {i}",
+            f"    return total",
+            "",
+        ]
+    extra_methods = []
+    for i in range(size):
+        extra_methods += [
+            "",
+            f"def extra_{i}(self, colony):",
+            f"    {dist} = 0",
+            f"    for {place} in colony.places:",
+            f"        if {place}.ant is self and {dist} == False:",
+            f"            {dist} = {dist} + {i}",
+            f"    return {dist}",
+        ]
+    return SKELETON.format(
+        add_insect=indent(add_insect, 4),
+        filler="\n".join(filler),
+        max_range=rng.choice(["float('inf')", "100", "999999"]),
+        nearest_bee=indent(nearest_bee, 2),
+        short_init=short_init,
+        long_nearest=long_nearest,
+        fire_reduce=indent(fire_reduce, 2),
+        can_contain=indent(can_contain, 2),
+        extra_methods=indent(extra_methods, 1),
+    )
+
+
+def generate_corpus(count, seed=61):
+    rng = random.Random(seed)
+    return [generate_submission(rng, rng.choice([0, 1, 2, 4, 8])) for _ in range(count)]
+
+
+def per_item_us(func, items, repeat):
+    """Best-of-`repeat` microseconds per item for calling func on every item."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return 1e6 * best / max(len(items), 1)
+
+
+def problem_slices(corpus):
+    """{problem name: [sliced problem code, ...]}, sliced the same way get_problems does."""
+    analyzer.load_pack()
+    slices = {name: [] for name in analyzer.PROBLEMS}
+    for code in corpus:
+        for name, problem in analyzer.get_problems(code, cache=None).items():
+            slices[name].append(problem.code)
+    return slices
+
+
+def run_alone(checker, code, tree):
+    instance = checker(analyzer.SourceText(code))
+    instance.visit(tree)
+    return list(instance.comments())
+
+
+def benchmark(corpus, repeat):
+    slices = problem_slices(corpus)
+    trees = {name: [ast.parse(code) for code in codes] for name, codes in slices.items()}
+
+    checkers = {}
+    for name in analyzer.PROBLEMS:
+        for checker in analyzer.CHECKERS + analyzer.TARGETED_CHECKERS.get(name, []):
+            pairs = list(zip(slices[name], trees[name]))
+            us = per_item_us(lambda pair: run_alone(checker, *pair), pairs, repeat)
+            key = analyzer.checker_label(checker)
+            checkers[key] = checkers.get(key, 0) + us
+
+    problems = {
+        name: per_item_us(lambda code: analyzer.check_problem(name, code), codes, repeat)
+        for name, codes in slices.items()
+    }
+
+    def cold(code):
+        analyzer.get_problems(code, cache=AnalysisCache())
+
+    warm_cache = AnalysisCache()
+    for code in corpus:
+        analyzer.get_problems(code, cache=warm_cache)
+
+    end_to_end = {
+        "uncached": per_item_us(
+            lambda code: analyzer.get_problems(code, cache=None), corpus, repeat
+        ),
+        "cold": per_item_us(cold, corpus, repeat),
+        "warm": per_item_us(
+            lambda code: analyzer.get_problems(code, cache=warm_cache), corpus, repeat
+        ),
+    }
+    return {"checkers": checkers, "problems": problems, "end_to_end": end_to_end}
+
+
+def compare(results, baseline):
+    """Return a line for every timing more than TOLERANCE times its baseline."""
+    regressions = []
+    for section in ("checkers", "problems", "end_to_end"):
+        for key, us in results[section].items():
+            before = baseline.get(section, {}).get(key)
+            if before and us > before * TOLERANCE:
+                regressions.append(
+                    f"{section}/{key}: {us:.1f} us, baseline {before:.1f} us"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=200, help="corpus size")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per measurement (best is kept)"
+    )
+    parser.add_argument("--seed", type=int, default=61, help="corpus random seed")
+    parser.add_argument("--json", metavar="FILE", help="save results as JSON")
+    parser.add_argument(
+        "--baseline", metavar="FILE", help="compare against results saved with --json"
+    )
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    corpus = generate_corpus(args.submissions, args.seed)
+    results = benchmark(corpus, args.repeat)
+    results["corpus"] = {
+        "submissions": len(corpus),
+        "seed": args.seed,
+        "lines": sum(code.count("\n") + 1 for code in corpus),
+    }
+    results["python"] = platform.python_version()
+
+    for section in ("checkers", "problems", "end_to_end"):
+        print(f"{section} (us per submission)")
+        for key, us in sorted(results[section].items(), key=lambda item: -item[1]):
+            print(f"  {key:<40}{us:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""End-to-end load test of fetching, prefetching and submitting against ok_standin.py.
+
+Serves a generated corpus of ants.py backups from a local stand-in okpy with
+the given latency, error rate and throttling, then "grades" every backup the
+way cli.py does: prefetched fetch + analysis, a fixed think time per backup,
+and comments plus a grade submitted through the background SubmissionQueue.
+
+Reports how long the grader waited on each backup, per-endpoint client
+latencies, the status codes the server sent, and how many grades arrived.
+
+Usage: python3 benchmarks/ok_load.py [--backups N] [--latency MS] [--error-rate P] [--error-status S]
+       [--rate N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ok_interface  # noqa: E402
+from analyzer_bench import generate_corpus  # noqa: E402
+from backup_cache import BackupCache  # noqa: E402
+from ok_standin import StandinServer  # noqa: E402
+
+
+def grade_all(ids, prefetch, think, submissions):
+    """Grade every backup, returning the seconds spent waiting on each."""
+    from cli import prefetch_backups
+
+    waits = []
+    for id, backup in prefetch_backups(ids, prefetch):
+        start = time.perf_counter()
+        try:
+            problems = backup.result().problems
+        except Exception as e:
+            print(f"backup {id} failed: {e!r}")
+            continue
+        finally:
+            waits.append(time.perf_counter() - start)
+        time.sleep(think)
+        comments = [c for problem in problems.values() for c in problem.comments]
+        submissions.put(id, comments, 2, "load test")
+    return waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--backups", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=100, help="milliseconds")
+    parser.add_argument("--jitter", type=float, default=50, help="milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--error-status", type=int, default=500, help="status of the injected failures"
+    )
+    parser.add_argument("--rate", type=float, help="server requests per second")
+    parser.add_argument("--prefetch", type=int, default=3)
+    parser.add_argument(
+        "--think", type=float, default=200, help="milliseconds spent grading each backup"
+    )
+    parser.add_argument("--seed", type=int, default=61)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    corpus = generate_corpus(args.backups, args.seed)
+    server = StandinServer(
+        {f"{i:04d}": code for i, code in enumerate(corpus)},
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate=args.rate,
+        seed=args.seed,
+    )
+    url = server.start()
+    token = server.issue_token()["access_token"]
+
+    # graded ids and downloaded backups go to a scratch directory
+    os.chdir(tempfile.mkdtemp())
+    ok_interface.client = ok_interface.OkClient(access_token=token, server=url)
+    ok_interface.cache = BackupCache(".backup_cache")
+    ok_interface.OPEN_GRADED = False
+
+    from submitter import SubmissionQueue
+
+    submissions = SubmissionQueue(backoff=0.1)
+    start = time.perf_counter()
+    waits = grade_all(list(server.backups), args.prefetch, args.think / 1000, submissions)
+    graded = time.perf_counter() - start
+    submissions.join()
+    total = time.perf_counter() - start
+    server.stop()
+
+    waits.sort()
+    print(f"graded {len(waits)} backups in {graded:.1f} s ({total:.1f} s with submissions)")
+    print(
+        f"waited {sum(waits):.1f} s on backups; "
+        f"median {1000 * waits[len(waits) // 2]:.0f} ms, max {1000 * waits[-1]:.0f} ms"
+    )
+    print(f"grades received: {len(server.scores)}/{len(server.backups)}")
+    print()
+    print(ok_interface.client.latency_report())
+    print()
+    for request, count in server.stats()["requests"].items():
+        print(f"{request:<16}{count:>7}")
+
+
+if __name__ == "__main__":
+    main()
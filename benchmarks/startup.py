@@ -0,0 +1,115 @@
+"""Startup-time benchmark for the entry points.
+
+Runs `python -X importtime -c "import <module>"` for each entry point in a fresh
+interpreter and reports the median cumulative import time together with the
+slowest imports it pulls in.
+
+Usage: python3 benchmarks/startup.py [--runs N] [--json FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ["cli", "batch", "analyzer", "ok_interface"]
+
+# a startup more than this much slower than the baseline is reported as a regression
+TOLERANCE = 1.25
+
+
+def import_times(module):
+    """Return the cumulative microseconds to import `module` and each of its direct imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name[1:].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+
+    # children are reported before their parent, so walk back from `module`'s own entry
+    # (interpreter startup imports such as site-packages .pth hooks come before it)
+    end = max(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == module)
+    times = {module: entries[end][2]}
+    for depth, name, cumulative in reversed(entries[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            times[name] = cumulative
+    return times
+
+
+def measure(module, runs):
+    samples = [import_times(module) for _ in range(runs)]
+    total = statistics.median(sample.get(module, 0) for sample in samples)
+    children = {}
+    for sample in samples:
+        for name, micros in sample.items():
+            if name != module:
+                children.setdefault(name, []).append(micros)
+    slowest = sorted(
+        ((name, statistics.median(values)) for name, values in children.items()),
+        key=lambda item: -item[1],
+    )[:5]
+    return {"total_ms": total / 1000, "slowest": {name: us / 1000 for name, us in slowest}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="imports per entry point")
+    parser.add_argument("--json", metavar="FILE", help="save results as JSON")
+    parser.add_argument(
+        "--baseline", metavar="FILE", help="compare against results saved with --json"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for module in ENTRY_POINTS:
+        try:
+            results[module] = measure(module, args.runs)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            continue
+        slowest = ", ".join(
+            f"{name} {ms:.1f}" for name, ms in results[module]["slowest"].items()
+        )
+        print(f"{module:<14}{results[module]['total_ms']:>8.1f} ms   ({slowest})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [
+            module
+            for module, result in results.items()
+            if module in baseline
+            and result["total_ms"] > baseline[module]["total_ms"] * TOLERANCE
+        ]
+        for module in regressions:
+            print(
+                f"REGRESSION: {module} imports in {results[module]['total_ms']:.1f} ms, "
+                f"baseline {baseline[module]['total_ms']:.1f} ms",
+                file=sys.stderr,
+            )
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
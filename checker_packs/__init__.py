@@ -0,0 +1,6 @@
+"""Per-project checker packs; analyzer loads only the one for COMPOSITION_PROJECT.
+
+Each pack defines PROBLEMS, mapping every graded problem to the [start marker,
+end marker] that delimit it in the project file, and registers the checkers for
+individual problems with analyzer.question_checker.
+"""
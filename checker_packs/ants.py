@@ -0,0 +1,114 @@
+"""Checkers for Ants Vs. SomeBees (ants.py)."""
+from analyzer import question_checker
+from patterns import PatternChecker, rule
+
+PROBLEMS = {
+    "Short and LongThrowers": ["class ShortThrower", "class FireAnt"],
+    "ThrowerAnt": ["class ThrowerAnt", "def throw_at"],
+    "FireAnt": ["class FireAnt", "class HungryAnt"],
+    "BodyguardAnt - Ant": ["class BodyguardAnt", "class TankAnt"],
+    "BodyguardAnt - Place": ["def add_insect", "def remove_insect"],
+}
+
+
+@question_checker("ThrowerAnt")
+class WrongMaxRangeChecker(PatternChecker):
+    rules = [
+        rule(
+            "Assign(targets=[Name('max_range')], value=(limit := Num(n < 10000)))",
+            lambda limit: f"The code uses the magic number {limit.value} here as the `max_range` which might cause "
+            f"problems in the future, because if we ever increased the board size, the `ThrowerAnt` would be unable "
+            f"to attack bees further than {limit.value} places away. Try using `float('inf')` (infinity) instead.",
+        )
+    ]
+
+
+@question_checker("ThrowerAnt")
+class WrongMaxRangeChecker(PatternChecker):
+    rules = [
+        rule(
+            "Assign(targets=[Name('max_range')], value=(limit := Num(n < 10000)))",
+            lambda limit: f"The code uses the magic number {limit.value} here as the `max_range` which might cause "
+            f"problems in the future, because if we ever increased the board size, the `ThrowerAnt` would be unable "
+            f"to attack bees further than {limit.value} places away. Try using `float('inf')` (infinity) instead.",
+        )
+    ]
+
+
+@question_checker("ThrowerAnt")
+class HiveEqualityNotIdentityChecker(PatternChecker):
+    rules = [
+        rule(
+            "Compare(left=Name('hive'), ops=[~IsNot()])"
+            " | Compare(ops=[~IsNot()], comparators=[Name('hive')])",
+            "Notice that we pass a `hive` instance directly to this method so we should use "
+            "Python's `is not` here to test identity. The code also works when using `!=` "
+            "but since there's only one specific `hive`, checking for identity here makes a "
+            "little more sense since the `Place` class doesn't define an equality method.",
+        )
+    ]
+
+
+@question_checker("ThrowerAnt")
+class HiveEqualityNotIdentityChecker(PatternChecker):
+    rules = [
+        rule(
+            "Str('Hive')",
+            "The code should not be checking if the name of the place is 'Hive'. The "
+            "abstraction barrier is being violated! This is why one of the parameters is "
+            "`hive`. This is a pointer to the Hive instance and can be used to check if the "
+            "current place is the hive. So `{place-var-name}.name != 'Hive'` should be "
+            "`{place-var-name} is not hive`.",
+            ("place-var-name",),
+        )
+    ]
+
+
+@question_checker("Short and LongThrowers")
+class RedefinedNearestBeeChecker(PatternChecker):
+    rules = [
+        rule(
+            "FunctionDef(name='nearest_bee')",
+            f"Instead of repeating all the code for `nearest_bee` for both `ShortThrower` and `LongThrower`, "
+            f"using the regular `ThrowerAnt`'s `nearest_bee` function would reduce the amount of code needed "
+            f"significantly. The point of classes is that you can generalize one function to do the tasks of "
+            f"many functions with minimal code changes.",
+        ),
+        rule(
+            "FunctionDef(name='__init__')",
+            f"An `__init__` method that simply calls it's base class's `__init__` is unnecessary because "
+            f"inheritance will do this automatically without this method in `LongThrower` and `ShortThrower`.",
+        ),
+    ]
+
+
+@question_checker("FireAnt")
+class NoCallClassReduceArmor(PatternChecker):
+    rules = [
+        rule(
+            "AugAssign(op=Sub(), value=Name('amount'))",
+            f"The `Ant.reduce_armor` method already takes care of removing an insect if its armor drops to "
+            f"0 or below, so we could take advantage of that by calling `Ant.reduce_armor(self, amount)` "
+            f"rather than duplicating the logic here. In addition, it would allow further modularity if "
+            f"we wanted to modify the `reduce_armor` method; instead of changing the code in many place, "
+            f"changing it in one place may suffice.",
+        ),
+        rule(
+            "AugAssign(op=Sub(), value=~Name('amount'))",
+            f"Consider calling the `Bee.reduce_armour` method rather than trying to manually reimplement "
+            f"it here, since this will duplicate logic already written elsewhere. In addition, it would "
+            f"allow further modularity if we wanted to modify the `reduce_armor` method; instead of "
+            f"changing the code in many place, changing it in one place may suffice.",
+        ),
+    ]
+
+
+@question_checker("BodyguardAnt - Place")
+class ExtraAttributeAccessChecker(PatternChecker):
+    rules = [
+        rule(
+            "Attribute(attr='is_container')",
+            f"Checking for `insect.is_container` or `self.ant.is_container` is redundant as it is handled by "
+            f"the `can_contain` method.",
+        )
+    ]
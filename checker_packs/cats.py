@@ -0,0 +1,6 @@
+"""Checkers for CATS (cats.py)."""
+
+PROBLEMS = {
+    "accuracy": ["def accuracy", "def wpm"],
+    "autocorrect": ["def autocorrect", "def sphinx_swap"],
+}
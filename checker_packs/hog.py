@@ -0,0 +1,32 @@
+"""Checkers for Hog (hog.py)."""
+from analyzer import Checker, Comment, question_checker
+
+PROBLEMS = {
+    "roll_dice": ["def roll_dice", "def free_bacon"],
+    "play": ["def play", "#######################"],
+    "max_scoring_num_rolls": ["def max_scoring_num_rolls", "def winner"],
+}
+
+
+@question_checker("roll_dice")
+class MultipleLoopChecker(Checker):
+    def __init__(self, code):
+        self.loop_cnt = 0
+
+    def comments(self):
+        if self.loop_cnt > 1:
+            yield Comment(
+                0,
+                "Having multiple loops makes the code more complicated than it should be. "
+                "Instead, the code could have a boolean flag that becomes true when a call to `dice()` is 1. "
+                "At the end, return the total of outcomes or 1 depending on the boolean flag after the loop. "
+                "By keeping the behavior similar to both pig out and non pig out cases, the code is greatly simplified.",
+            )
+
+    def visit_While(self, node):
+        self.loop_cnt += 1
+        self.generic_visit(node)
+
+    def visit_For(self, node):
+        self.loop_cnt += 1
+        self.generic_visit(node)
@@ -1,68 +1,128 @@
-import os
+import argparse
 import re
 import sys
 import traceback
 import readline
-from typing import NamedTuple, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, NamedTuple, List, Optional
 
-from PyInquirer import prompt
-from pygments import highlight
-from pygments.formatters.terminal import TerminalFormatter
-from pygments.lexers.python import PythonLexer
-
-from analyzer import get_problems, Comment
+import analyzer
+from analyzer import analysis_cache, get_problems, Comment, Problem
 from finalizing import grade
-from ok_interface import get_backup_ids, get_backup_code, submit_comment, submit_grade
+from ok_interface import client, get_backup_ids, get_backup_code
 from colorama import Fore, Style
+from revisions import AcceptedStore, carry_comments, unseen_suggestions
+from submitter import SubmissionQueue
+from telemetry import telemetry
+
+from templates import template_completer, template_search, templates
+
 
-from templates import template_completer, templates
+# number of backups fetched and analyzed ahead of the one being graded
+PREFETCH_DEPTH = 3
+# "class X" / "def y" markers find the definitions, not mentions in comments or strings
+ANALYSIS_MODE = "ast"
 
 
 class Grade(NamedTuple):
     score: int
     message: str
     comments: List[Comment]
+    # the same comments, by problem name
+    accepted: Dict[str, List[Comment]]
+
+
+class Backup(NamedTuple):
+    problems: Dict[str, Problem]
+    # the backup this one revises, and its problems
+    previous_id: Optional[str] = None
+    previous: Optional[Dict[str, Problem]] = None
+
+
+# comments accepted on each graded backup, carried over when it is revised
+accepted_store = AcceptedStore()
+
+
+# clears the screen and moves the cursor home, without spawning a `clear` process
+CLEAR_SCREEN = "\033[2J\033[H"
+
 
+@lru_cache(maxsize=None)
+def highlighter():
+    """Return the shared lexer and formatter, importing pygments on first use."""
+    from pygments.formatters.terminal import TerminalFormatter
+    from pygments.lexers.python import PythonLexer
 
-def clear():
-    os.system("cls" if os.name == "nt" else "clear")
+    return PythonLexer(), TerminalFormatter()
+
+
+class HighlightedCode(NamedTuple):
+    # every highlighted, numbered line, each ending in a newline
+    text: str
+    # offsets[i] is where line i starts in text; offsets[-1] == len(text)
+    offsets: List[int]
+    # indentation for annotations below each line
+    indents: List[int]
+
+
+@lru_cache(maxsize=64)
+def highlight_problem(code, initial_line_number):
+    """Syntax highlight and number a problem's code once, however often it is redrawn."""
+    from pygments import highlight
+
+    lines = highlight(code, *highlighter()).split("\n")
+    numbered = [
+        f"{Fore.GREEN}{initial_line_number + i} {Style.RESET_ALL}{line}\n"
+        for i, line in enumerate(lines)
+    ]
+    offsets = [0]
+    for line in numbered:
+        offsets.append(offsets[-1] + len(line))
+    indents = [len(line) - len(line.strip()) + 3 for line in lines]
+    return HighlightedCode("".join(numbered), offsets, indents)
+
+
+@lru_cache(maxsize=1024)
+def render_annotations(indent_level, accepted, current):
+    """Render the comments shown under one line: accepted ones, then the one being considered."""
+    out = [Fore.MAGENTA + " " * indent_level + "# " + comment + "\n" for comment in accepted]
+    if current is not None:
+        out.append(Fore.RED + Style.BRIGHT + " " * indent_level + "# " + current + "\n")
+    return "".join(out)
 
 
 def display_code_with_accepted_and_potential_comments(
     name, problem, accepted_comments, curr_comment=None
 ):
-    clear()
-    print(f"Problem: {name}")
-    highlighted_code = highlight(problem.code, PythonLexer(), TerminalFormatter())
-    for i, line in enumerate(highlighted_code.split("\n")):
-        line_num = problem.initial_line_number + i
-        if line_num in accepted_comments or (
-            curr_comment and line_num == curr_comment.line_num
-        ):
-            print()
-        print(f"{Fore.GREEN}{line_num} {Style.RESET_ALL}{line}")
-        if line_num in accepted_comments or (
-            curr_comment and line_num == curr_comment.line_num
-        ):
-            indent_level = len(line) - len(line.strip()) + 3
-            if line_num in accepted_comments:
-                for accepted_comment in accepted_comments[line_num]:
-                    print(
-                        Fore.MAGENTA
-                        + " " * indent_level
-                        + "# "
-                        + accepted_comment.comment
-                    )
-            if curr_comment and line_num == curr_comment.line_num:
-                print(
-                    Fore.RED
-                    + Style.BRIGHT
-                    + " " * indent_level
-                    + "# "
-                    + curr_comment.comment
-                )
-            print()
-    print()
+    code = highlight_problem(problem.code, problem.initial_line_number)
+    annotated = set(accepted_comments)
+    if curr_comment:
+        annotated.add(curr_comment.line_num)
+
+    out = [CLEAR_SCREEN, f"Problem: {name}\n"]
+    start = 0
+    for line_num in sorted(annotated):
+        i = line_num - problem.initial_line_number
+        if not 0 <= i < len(code.indents):
+            continue
+        current = None
+        if curr_comment and line_num == curr_comment.line_num:
+            current = curr_comment.comment
+        accepted = tuple(
+            comment.comment for comment in accepted_comments.get(line_num, [])
+        )
+        out.append(code.text[code.offsets[start] : code.offsets[i]])
+        out.append("\n")
+        out.append(code.text[code.offsets[i] : code.offsets[i + 1]])
+        out.append(render_annotations(code.indents[i], accepted, current))
+        out.append("\n")
+        start = i + 1
+    out.append(code.text[code.offsets[start] :])
+    out.append("\n")
+    sys.stdout.write("".join(out))
+    sys.stdout.flush()
 
 
 def complete(comment):
@@ -86,12 +146,48 @@ def complete(comment):
     return Comment(comment.line_num, response["final"])
 
 
-def add_comment(accepted_comments, new_comment):
-    if not new_comment:
-        return
-    if new_comment.line_num not in accepted_comments:
-        accepted_comments[new_comment.line_num] = []
-    accepted_comments[new_comment.line_num].append(new_comment)
+class AcceptedComments:
+    """The comments accepted for one problem, indexed by line.
+
+    Iterating gives the lines that have comments. Comments are kept in the order
+    they were accepted, grouped by line, and every addition is journaled so that
+    undo() can roll back to an earlier mark() without rebuilding anything.
+    """
+
+    def __init__(self):
+        self.lines = {}
+        self.journal = []
+
+    def add(self, comment):
+        if not comment:
+            return
+        self.lines.setdefault(comment.line_num, []).append(comment)
+        self.journal.append(comment.line_num)
+
+    def get(self, line_num, default=()):
+        return self.lines.get(line_num, default)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.journal)
+
+    def mark(self):
+        return len(self.journal)
+
+    def undo(self, mark=0):
+        """Remove every comment added since `mark` (default: all of them)."""
+        while len(self.journal) > mark:
+            line_num = self.journal.pop()
+            comments = self.lines[line_num]
+            comments.pop()
+            if not comments:
+                del self.lines[line_num]
+
+    def flatten(self):
+        """Return every accepted comment, grouped by line, lines in order of first use."""
+        return [comment for comments in self.lines.values() for comment in comments]
 
 
 class Interrupt(Exception):
@@ -101,17 +197,21 @@ class Interrupt(Exception):
 
 
 def wrapped_prompt(q):
-    ret = prompt([q])
-    if not ret:
-        receive_command()
+    from PyInquirer import prompt  # deferred: prompt_toolkit is slow to import
+
+    with telemetry.span("prompt", kind=q["type"], message=q["message"]):
+        ret = prompt([q])
+        if not ret:
+            receive_command()
     return ret
 
 
 def wrapped_input(q):
-    try:
-        ret = input(q)
-    except KeyboardInterrupt:
-        return receive_command()
+    with telemetry.span("prompt", kind="text"):
+        try:
+            ret = input(q)
+        except KeyboardInterrupt:
+            return receive_command()
     return ret
 
 
@@ -119,21 +219,86 @@ def receive_command():
     inp = input(
         f"\n\n"
         f"cancel = cancel this comment\n"
-        f"clear = clear all question comments\n"
+        f"clear = clear all question comments not carried over from a revision\n"
         f"reset = reset all student comments\n"
         f"? {Style.BRIGHT}{Fore.RED}command: {Style.RESET_ALL}"
     )
     raise Interrupt(inp)
 
 
-def main():
+def load_backup(id, offline=False, previous_id=None):
+    """Fetch and analyze backup `id`, as a revision of `previous_id` if given."""
+    code = get_backup_code(id, offline)
+    if previous_id is None:
+        with telemetry.span("get_problems", backup=id):
+            return Backup(get_problems(code, mode=ANALYSIS_MODE))
+
+    previous_code = get_backup_code(previous_id, offline)
+    with telemetry.span("get_problems", backup=id):
+        previous = get_problems(previous_code, mode=ANALYSIS_MODE)
+        problems = get_problems(code, mode=ANALYSIS_MODE, previous=previous)
+    return Backup(problems, previous_id, previous)
+
+
+def prefetch_backups(ids, depth=PREFETCH_DEPTH, offline=False, revisions=None):
+    """Yield (id, future) pairs for each backup id, in order.
+
+    While the caller works on one backup, the next `depth` backups are fetched
+    and analyzed on a background thread pool. Exceptions are raised by the
+    future's result(), so the caller can report them as if loading were inline.
+
+    `revisions` maps backup ids to the ids of the backups they revise.
+    """
+    if depth < 0:
+        raise ValueError(f"prefetch depth must be 0 or more, not {depth}")
+    revisions = revisions or {}
+    ids = iter(ids)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max(depth, 1))
+    try:
+        while True:
+            while len(pending) <= depth:
+                id = next(ids, None)
+                if id is None:
+                    break
+                future = executor.submit(load_backup, id, offline, revisions.get(id))
+                pending.append((id, future))
+            if not pending:
+                return
+            yield pending.popleft()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def main(prefetch=PREFETCH_DEPTH, offline=False, revisions=None):
     readline.parse_and_bind("tab: complete")
     readline.set_completer_delims("")
     print("cli.py main")
-    for id in get_backup_ids():
+    # offline, grades are only saved in the outbox, so okpy is never contacted
+    submissions = SubmissionQueue(offline=offline)
+    resent = [] if offline else submissions.resume()
+    if resent:
+        print(f"Resending {len(resent)} graded backup(s) left unsubmitted last time")
+    try:
+        grade_queue(prefetch, offline, submissions, revisions)
+    finally:
+        with telemetry.span("submit_wait"):
+            submissions.join()
+        print(client.latency_report())
+        if analyzer.checker_stats is not None:
+            print(analyzer.checker_stats.report())
+
+
+def grade_queue(prefetch, offline, submissions, revisions=None):
+    # graded already, and waiting in the outbox to be submitted
+    ids = [id for id in get_backup_ids() if id not in submissions.outbox]
+    for id, future in prefetch_backups(ids, prefetch, offline, revisions):
         try:
-            code = get_backup_code(id)
-            problems = get_problems(code)
+            # the grader is blocked until the backup is fetched and analyzed
+            with telemetry.span("backup_wait", backup=id):
+                backup = future.result()
         except Exception:
             print(
                 f"{Fore.RED}An exception occurred while processing backup id #{id}",
@@ -143,122 +308,223 @@ def main():
             print(f"{Style.RESET_ALL}")
             continue
 
-        grade = grade_backup(problems)
+        problems, carried = backup.problems, {}
+        if backup.previous is not None:
+            # the previous revision may have been graded while this one was prefetched
+            carried = carry_over(id, backup)
+            problems = unseen_suggestions(backup.previous, problems)
+        with telemetry.context(backup=id), telemetry.span("backup"):
+            grade = grade_backup(problems, carried)
         for comment in grade.comments:
             print(comment)
             assert not comment.fields, "fields not substituted!"
-            submit_comment(id, comment.line_num, comment.comment)
-        submit_grade(id, grade.score, grade.message)
+        accepted_store.save(id, grade.accepted)
+        submissions.put(id, grade.comments, grade.score, grade.message)
+
+
+def carry_over(id, backup):
+    """Return the comments accepted on the revised backup, moved onto this one.
+
+    The grader is shown how many were carried over and every comment that was
+    dropped because its line was rewritten.
+    """
+    print(CLEAR_SCREEN, end="")
+    print(f"Backup #{id} revises #{backup.previous_id}.")
+    accepted = accepted_store.load(backup.previous_id)
+    if accepted is None:
+        print(f"No comments were saved for #{backup.previous_id} to carry over.")
+        accepted = {}
+    carried, dropped = carry_comments(backup.previous, backup.problems, accepted)
+    print(f"{sum(map(len, carried.values()))} accepted comment(s) carried over.")
+    if dropped:
+        print(f"{Fore.RED}Dropped, because their lines were rewritten or removed:{Style.RESET_ALL}")
+        for name, comment in dropped:
+            print(f"{Fore.GREEN}{name}, line {comment.line_num}{Style.RESET_ALL}")
+            print(f"  {comment.comment}")
+    input(f"? {Style.BRIGHT} Press enter to continue {Style.RESET_ALL}")
+    return carried
+
+
+def grade_backup(problems, carried=None):
+    carried = carried or {}
+    while True:
+        comments = []
+        accepted = {}
+        try:
+            for name, problem in problems.items():
+                accepted[name] = grade_problem(name, problem, carried.get(name, ()))
+                comments.extend(accepted[name])
+            score, message = grade(comments)
+            print(message)
+            q = {
+                "type": "confirm",
+                "name": "ok",
+                "message": "Does this grade look reasonable?",
+            }
+            response = wrapped_prompt(q)
+            return Grade(score, message, comments, accepted)
+        except Interrupt as e:
+            if e.cmd != "reset":
+                raise
 
 
-def grade_backup(problems):
-    comments = []
-    try:
-        for name, problem in problems.items():
-            comments.extend(grade_problem(name, problem))
-        score, message = grade(comments)
-        print(message)
-        q = {
-            "type": "confirm",
-            "name": "ok",
-            "message": "Does this grade look reasonable?",
-        }
-        response = wrapped_prompt(q)
-        return Grade(score, message, comments)
-    except Interrupt as e:
-        if e.cmd == "reset":
-            return grade_backup(problems)
-        raise
+def grade_problem(name, problem, carried=()):
+    accepted_comments = AcceptedComments()
+    for comment in carried:
+        accepted_comments.add(comment)
+    # "clear" removes the comments accepted since, keeping those carried over
+    carried_mark = accepted_comments.mark()
+    with telemetry.context(problem=name):
+        while True:
+            try:
+                review_problem(name, problem, accepted_comments)
+                return accepted_comments.flatten()
+            except Interrupt as e:
+                if e.cmd != "clear":
+                    raise
+                accepted_comments.undo(carried_mark)
 
 
-def grade_problem(name, problem):
+def review_problem(name, problem, accepted_comments):
     readline.set_completer(template_completer(name))
 
-    try:
-        accepted_comments = {}
-        for comment in problem.comments:
-            try:
-                display_code_with_accepted_and_potential_comments(
-                    name, problem, accepted_comments, comment
-                )
-                print(f"{Fore.CYAN}Potential comment: {Style.RESET_ALL}")
-                print(
-                    f"{Fore.GREEN}{comment.line_num}{Style.RESET_ALL} {comment.comment}"
-                )
+    for comment in problem.comments:
+        mark = accepted_comments.mark()
+        try:
+            display_code_with_accepted_and_potential_comments(
+                name, problem, accepted_comments, comment
+            )
+            print(f"{Fore.CYAN}Potential comment: {Style.RESET_ALL}")
+            print(f"{Fore.GREEN}{comment.line_num}{Style.RESET_ALL} {comment.comment}")
+            q = {
+                "type": "confirm",
+                "name": "ok",
+                "message": "Add comment",
+                "default": True,
+            }
+            response = wrapped_prompt(q)
+            if response["ok"]:
+                accepted_comments.add(complete(comment))
+        except Interrupt as e:
+            if e.cmd == "cancel":
+                accepted_comments.undo(mark)
+                continue
+            raise
+
+    while True:
+        mark = accepted_comments.mark()
+        try:
+            display_code_with_accepted_and_potential_comments(
+                name, problem, accepted_comments
+            )
+            response = wrapped_input(
+                f"? {Style.BRIGHT} Custom comment type: {Style.RESET_ALL}"
+            )
+            if not response:
                 q = {
                     "type": "confirm",
                     "name": "ok",
-                    "message": "Add comment",
+                    "message": "Go to next question?",
                     "default": True,
                 }
                 response = wrapped_prompt(q)
                 if response["ok"]:
-                    add_comment(accepted_comments, complete(comment))
-            except Interrupt as e:
-                if e.cmd == "cancel":
-                    continue
-                raise
-
-        while True:
-            try:
-                display_code_with_accepted_and_potential_comments(
-                    name, problem, accepted_comments
+                    break
+                continue
+            if response not in templates:
+                print(f"{Fore.RED} Template {response} not found! {Style.RESET_ALL}")
+                suggestions = template_search(name).search(response)
+                if suggestions:
+                    print(f" Did you mean: {', '.join(suggestions)}?")
+                wrapped_input(
+                    f"? {Style.BRIGHT} Press enter to continue {Style.RESET_ALL}"
                 )
-                response = wrapped_input(
-                    f"? {Style.BRIGHT} Custom comment type: {Style.RESET_ALL}"
+                continue
+            text = templates[response]
+            q = {"type": "input", "name": "line_num", "message": "Line number:"}
+            response = wrapped_prompt(q)
+            try:
+                line_num = int(response["line_num"])
+            except ValueError:
+                print(
+                    f"{Fore.RED} Expected a number, received {response['line_num']} not found! {Style.RESET_ALL}"
                 )
-                if not response:
-                    q = {
-                        "type": "confirm",
-                        "name": "ok",
-                        "message": "Go to next question?",
-                        "default": True,
-                    }
-                    response = wrapped_prompt(q)
-                    if response["ok"]:
-                        break
-                    continue
-                if response not in templates:
-                    print(
-                        f"{Fore.RED} Template {response} not found! {Style.RESET_ALL}"
-                    )
-                    continue
-                text = templates[response]
-                q = {"type": "input", "name": "line_num", "message": "Line number:"}
+                continue
+
+            if text:
+                fields = tuple(set(re.findall(r"{(.*?)}", text)))
+                comment = Comment(line_num, text, fields)
+                accepted_comments.add(complete(comment))
+            else:
+                q = {"type": "input", "name": "text", "message": "Comment:"}
                 response = wrapped_prompt(q)
-                try:
-                    line_num = int(response["line_num"])
-                except ValueError:
-                    print(
-                        f"{Fore.RED} Expected a number, received {response['line_num']} not found! {Style.RESET_ALL}"
-                    )
-                    continue
-
-                if text:
-                    fields = list(set(re.findall(r"{(.*?)}", text)))
-                    comment = Comment(line_num, text, fields)
-                    add_comment(accepted_comments, complete(comment))
-                else:
-                    q = {"type": "input", "name": "text", "message": "Comment:"}
-                    response = wrapped_prompt(q)
-                    comment = Comment(line_num, response["text"], [])
-                    add_comment(accepted_comments, comment)
-            except Interrupt as e:
-                if e.cmd == "cancel":
-                    continue
-                raise
-        print()
+                accepted_comments.add(Comment(line_num, response["text"]))
+        except Interrupt as e:
+            if e.cmd == "cancel":
+                accepted_comments.undo(mark)
+                continue
+            raise
+    print()
+
+
+def revision(text):
+    new, _, old = text.partition("=")
+    if not new or not old:
+        raise argparse.ArgumentTypeError(f"expected NEW=OLD backup ids, not {text!r}")
+    return new, old
 
-        return list(sum(accepted_comments.values(), []))
 
-    except Interrupt as e:
-        if e.cmd == "clear":
-            return grade_problem(name, problem)
-        raise
+def prefetch_depth(text):
+    depth = int(text)
+    if depth < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {depth}")
+    return depth
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Composition grading assistant")
+    parser.add_argument(
+        "--prefetch",
+        type=prefetch_depth,
+        default=PREFETCH_DEPTH,
+        help="number of backups to fetch and analyze ahead of the current one",
+    )
+    parser.add_argument(
+        "--revision",
+        type=revision,
+        action="append",
+        default=[],
+        metavar="NEW=OLD",
+        help="grade backup NEW as a revision of OLD, keeping OLD's accepted comments",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="grade only backups already in the local backup cache",
+    )
+    parser.add_argument(
+        "--analysis-cache",
+        metavar="DIR",
+        help="also keep analyzer results in DIR so they are reused across sessions",
+    )
+    parser.add_argument(
+        "--profile-checkers",
+        metavar="FILE",
+        help="time every checker and write per-checker stats to FILE as JSON on exit",
+    )
+    parser.add_argument(
+        "--telemetry",
+        metavar="FILE",
+        help="append timed spans for each stage of grading to FILE (see telemetry.py)",
+    )
+    args = parser.parse_args()
+    if args.telemetry:
+        telemetry.open(args.telemetry)
+    if args.analysis_cache:
+        analysis_cache.persist(args.analysis_cache)
+    if args.profile_checkers:
+        analyzer.enable_profiling(args.profile_checkers)
     try:
-        main()
+        main(args.prefetch, args.offline, dict(args.revision))
     except:
         print(f"{Style.RESET_ALL}")
@@ -0,0 +1,151 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+# appended ids written before the journal is fsynced
+SYNC_EVERY = 16
+
+
+class CompletedStore:
+    """Set of graded submission ids backed by an append-only journal.
+
+    The journal is the `completed` file: one id per line. Each id is appended
+    with a single O_APPEND write, so several graders can share a directory and
+    append concurrently. Appends hold a shared lock on `<path>.lock` and
+    compaction holds it exclusively, so compaction never drops an id that
+    another process is writing.
+
+    Arguments:
+    path -- the journal file (default "completed")
+    sync_every -- fsync the journal after this many appends (default 16)
+    """
+
+    def __init__(self, path="completed", sync_every=SYNC_EVERY):
+        self.path = path
+        self.sync_every = sync_every
+        self.ids = set()
+        self.lines = 0
+        self._offset = 0
+        self._inode = None
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self._fd = None
+        self._lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self.reload()
+
+    def __contains__(self, id):
+        return id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def reload(self):
+        """Pick up ids appended to the journal since it was last read, including by other processes."""
+        with self._lock, self._file_lock(shared=True):
+            try:
+                f = open(self.path, "rb")
+            except FileNotFoundError:
+                return
+            with f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode:
+                    # compacted since the last read: everything is still in it, so start over
+                    self.ids.clear()
+                    self.lines = self._offset = 0
+                    self._inode = inode
+                f.seek(self._offset)
+                data = f.read()
+            # leave a partially written last line for the next reload
+            end = data.rfind(b"\n") + 1
+            self._offset += end
+            for line in data[:end].decode().splitlines():
+                if line.strip():
+                    self.ids.add(line.strip())
+                    self.lines += 1
+
+    def add(self, id):
+        """Record `id` as graded."""
+        with self._lock:
+            if id in self.ids:
+                return
+            with self._file_lock(shared=True):
+                if self._journal_replaced():
+                    self._reopen()
+                os.write(self._fd, f"{id}\n".encode())
+            self.ids.add(id)
+            self.lines += 1
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def compact(self):
+        """Rewrite the journal with each graded id once, in the order first graded."""
+        with self._lock, self._file_lock(shared=False):
+            self._sync()
+            seen = {}
+            try:
+                with open(self.path) as f:
+                    for line in f:
+                        if line.strip():
+                            seen.setdefault(line.strip(), None)
+            except FileNotFoundError:
+                pass
+            data = "".join(f"{id}\n" for id in seen).encode()
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.ids = set(seen)
+            self.lines = len(seen)
+            self._offset = len(data)
+            self._reopen()
+            self._inode = os.fstat(self._fd).st_ino
+
+    def _sync(self):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+
+    def _reopen(self):
+        if self._fd is not None:
+            self._sync()
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _journal_replaced(self):
+        """Whether the journal we append to is missing or was swapped out by compaction."""
+        if self._fd is None:
+            return True
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    @contextmanager
+    def _file_lock(self, shared):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
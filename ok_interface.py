@@ -1,12 +1,206 @@
+import atexit
+import os
 import re
-import webbrowser
-
-import requests
+import tempfile
+import threading
+import time
 
 import auth
+from backup_cache import BackupCache, code_from_messages
+from completed_store import CompletedStore
+from telemetry import telemetry
+
+# connections kept open to okpy; covers the prefetch threads plus the submission workers
+POOL_SIZE = 8
+# seconds to wait for okpy to connect / respond
+TIMEOUT = (5, 30)
+# open each backup's okpy page once its grade is submitted
+OPEN_GRADED = True
+# attempts per request before giving up on it
+MAX_ATTEMPTS = 4
+# seconds to wait before the first retry, doubling after each failure
+BACKOFF = 1.0
+# statuses okpy answers without acting on the request, so it is safe to send again
+RETRY_STATUSES = {429, 503}
+
+
+class OkError(Exception):
+    """okpy answered a request with an error status."""
+
+    def __init__(self, endpoint, status_code):
+        super().__init__(f"okpy answered {status_code} to {endpoint}")
+        self.status_code = status_code
+
+
+def unprocessed(error):
+    """Return whether `error` shows okpy never acted on the request."""
+    if isinstance(error, OkError):
+        return error.status_code in RETRY_STATUSES
+    from requests.exceptions import ConnectionError, ConnectTimeout
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, ConnectTimeout):
+        return True
+    # refused or unresolvable; a connection dropped mid-request is ambiguous
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def retry(func, *args, attempts=MAX_ATTEMPTS, backoff=BACKOFF):
+    """Call func(*args), trying again with exponential backoff while okpy didn't process it."""
+    for attempt in range(attempts):
+        try:
+            return func(*args)
+        except Exception as e:
+            if attempt == attempts - 1 or not unprocessed(e):
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+
+class OkClient:
+    """Shared, pooled connection to the okpy API.
+
+    Nothing is imported or authenticated until the first request, so code paths
+    that never talk to okpy never touch the network.
+
+    Arguments:
+    access_token -- OAuth token sent with every request (default: authenticate on
+        first use, reusing and refreshing the token stored in auth.TOKEN_FILE)
+    server -- base URL of the OK server (default: auth.OK_SERVER_URL)
+    pool_size -- number of keep-alive connections to hold open
+    timeout -- (connect, read) timeout in seconds for each request
+    """
+
+    def __init__(
+        self,
+        access_token=None,
+        server=auth.OK_SERVER_URL,
+        pool_size=POOL_SIZE,
+        timeout=TIMEOUT,
+    ):
+        self.server = server
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.access_token = access_token
+        self.oauth = None
+        self.latency = {}
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._latency_lock = threading.Lock()
 
-ACCESS_TOKEN = auth.OAuthSession().auth()
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
 
+                if self.access_token is None:
+                    self.oauth = auth.OAuthSession(session=auth.TokenStore())
+                    self.oauth.auth()
+                    self.oauth.start_refresher()
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+        return self._session
+
+    def get(self, endpoint, path, **kwargs):
+        return self.request("GET", endpoint, path, **kwargs)
+
+    def post(self, endpoint, path, **kwargs):
+        return self.request("POST", endpoint, path, **kwargs)
+
+    def request(self, method, endpoint, path, **kwargs):
+        """Send a request, recording its latency under the `endpoint` label."""
+        session = self.session
+        # read per request, since the token is refreshed in the background
+        token = self.oauth.access_token if self.oauth else self.access_token
+        start = time.perf_counter()
+        try:
+            return session.request(
+                method,
+                self.server + path,
+                params={"access_token": token},
+                timeout=self.timeout,
+                **kwargs,
+            )
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._latency_lock:
+                self.latency.setdefault(endpoint, EndpointStats()).add(elapsed)
+
+    def latency_report(self):
+        """Return a table of request counts and latencies for each endpoint."""
+        lines = [f"{'endpoint':<10}{'calls':>7}{'total s':>10}{'mean ms':>10}{'max ms':>10}"]
+        with self._latency_lock:
+            for endpoint, stats in sorted(self.latency.items()):
+                lines.append(
+                    f"{endpoint:<10}{stats.count:>7}{stats.total:>10.2f}"
+                    f"{1000 * stats.total / stats.count:>10.0f}{1000 * stats.max:>10.0f}"
+                )
+        return "\n".join(lines)
+
+
+client = OkClient()
+cache = BackupCache()
+
+_completed_stores = {}
+_completed_stores_lock = threading.Lock()
+
+
+def open_completed(path="completed"):
+    """Return the shared CompletedStore for `path`.
+
+    The journal is compacted on first open if most of its lines are duplicates.
+    """
+    with _completed_stores_lock:
+        if path not in _completed_stores:
+            store = CompletedStore(path)
+            if store.lines > 2 * len(store):
+                store.compact()
+            atexit.register(store.close)
+            _completed_stores[path] = store
+        return _completed_stores[path]
+
+
+# a submission link in the grading queue HTML; ids are short and never contain these characters
+BACKUP_LINK = re.compile(r"/composition/([^/?#&\"'<>\s]{1,64})\?")
+# longest possible match, so a chunk boundary never splits one unseen
+MAX_LINK_LENGTH = len("/composition/") + 64 + 1
+# characters of the queue file read at a time
+READ_CHUNK = 1 << 16
+
+
+def iter_queue_ids(file):
+    """Yield submission ids linked from `file`, in order, reading it incrementally."""
+    with open(file) as f:
+        buffer = ""
+        while True:
+            chunk = f.read(READ_CHUNK)
+            buffer += chunk
+            # matches starting this far from the end might continue in the next chunk
+            cutoff = len(buffer) - MAX_LINK_LENGTH if chunk else len(buffer)
+            for match in BACKUP_LINK.finditer(buffer):
+                if match.start() >= cutoff:
+                    break
+                yield match.group(1)
+            if not chunk:
+                return
+            buffer = buffer[max(cutoff, 0) :]
 
 
 def get_backup_ids(file="raw_queue.txt", completed_file="completed"):
@@ -19,43 +213,56 @@ def get_backup_ids(file="raw_queue.txt", completed_file="completed"):
     completed_file -- the file path to the list of completed submission IDs (default "completed")
     """
 
-    with open(file, "r+") as f, open(completed_file) as g:
-        text = f.read()
-        ids = re.findall(r"/composition/(.+)\?", text)
-        completed_ids = [id.strip() for id in g]
-        ids = [id for id in ids if id not in completed_ids]
-        f.seek(0)
-        f.write(
-            "\n".join(
-                f"https://okpy.org/admin/composition/{id}?diff=full" for id in ids
+    completed = open_completed(completed_file)
+    completed.reload()
+    ids = list(dict.fromkeys(id for id in iter_queue_ids(file) if id not in completed))
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file)))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(
+                "\n".join(
+                    f"{auth.OK_SERVER_URL}/admin/composition/{id}?diff=full"
+                    for id in ids
+                )
             )
-        )
-        f.truncate()
-        return ids
+        # mkstemp makes the file private; keep the queue file's own permissions
+        os.chmod(tmp, os.stat(file).st_mode)
+        os.replace(tmp, file)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return ids
 
 
-def get_backup_code(id):
+def get_backup_code(id, offline=False):
     """Returns the code to be reviewed.
 
+    Backups are served from the local backup cache when possible and cached after
+    being downloaded.
+
     Arguments:
     id -- the id of the submission to be graded.
+    offline -- only read from the backup cache, never from okpy (default False)
     """
 
-    params = {"access_token": ACCESS_TOKEN}
-    r = requests.get(f"https://okpy.org/api/v3/backups/{id}", params=params)
-    messages = r.json()["data"]["messages"]
-    out = None
-    for message in messages:
-        #TODO: Change references to <proj>.py when the project changes
-        if "ants.py" in message["contents"]:
-            if out is not None:
-                raise Exception("Multiple ants.py found???")
-            out = message["contents"]["ants.py"]
+    with telemetry.span("get_backup_code", backup=id) as span:
+        messages = cache.get(id)
+        span["cached"] = messages is not None
+        if messages is None:
+            if offline:
+                raise Exception(f"Backup {id} is not cached and OK is offline")
+            messages = retry(fetch_backup, id)
+            cache.put(id, messages)
+    return code_from_messages(messages)
 
-    if out is None:
-        raise Exception("No ants.py found!!!")
 
-    return out
+def fetch_backup(id):
+    """Return backup `id`'s messages from okpy."""
+    r = client.get("backup", f"/api/v3/backups/{id}")
+    if r.status_code != 200:
+        raise OkError("backup", r.status_code)
+    return r.json()["data"]["messages"]
 
 
 def submit_comment(id, line, message):
@@ -67,13 +274,12 @@ def submit_comment(id, line, message):
     message -- Comment message
     """
 
-    params = {"access_token": ACCESS_TOKEN}
     #TODO: Change reference to <proj>.py when the project changes
     data = {"filename": "ants.py", "line": line, "message": message}
-    r = requests.post(
-        f"https://okpy.org/api/v3/backups/{id}/comment/", params=params, data=data
-    )
-    assert r.status_code == 200, "fail"
+    with telemetry.span("submit_comment", backup=id):
+        r = client.post("comment", f"/api/v3/backups/{id}/comment/", data=data)
+        if r.status_code != 200:
+            raise OkError("comment", r.status_code)
 
 
 def submit_grade(id, score, message, completed="completed"):
@@ -86,10 +292,13 @@ def submit_grade(id, score, message, completed="completed"):
     completed -- File with list of graded IDs.
     """
 
-    params = {"access_token": ACCESS_TOKEN}
     data = {"bid": id, "kind": "composition", "score": score, "message": message}
-    r = requests.post(f"https://okpy.org/api/v3/score/", params=params, data=data)
-    assert r.status_code == 200, "fail"
-    webbrowser.open(f"https://okpy.org/admin/composition/{id}")
-    with open(completed, "a") as f:
-        f.write(id + "\n")
+    with telemetry.span("submit_grade", backup=id):
+        r = client.post("score", "/api/v3/score/", data=data)
+        if r.status_code != 200:
+            raise OkError("score", r.status_code)
+    if OPEN_GRADED:
+        import webbrowser
+
+        webbrowser.open(f"{client.server}/admin/composition/{id}")
+    open_completed(completed).add(id)
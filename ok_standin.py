@@ -0,0 +1,278 @@
+"""A local stand-in for the parts of the okpy API the assistant uses.
+
+Usage: python3 ok_standin.py DIR [--port PORT] [--latency MS] [--error-rate P] [--error-status S] [--rate N]
+
+Serves every DIR/<id>.py as backup <id>, then point the assistant at it with
+OK_SERVER_URL=http://127.0.0.1:PORT. Comments and scores are accepted and kept
+in memory; GET /_stats reports them along with request counts.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+# seconds an issued access token is valid for
+TOKEN_LIFETIME = 6 * 60 * 60
+
+BACKUP = re.compile(r"/api/v3/backups/([^/]+)$")
+COMMENT = re.compile(r"/api/v3/backups/([^/]+)/comment/$")
+
+
+def load_backups(directory):
+    """Return {id: code} for every DIR/<id>.py."""
+    backups = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            with open(os.path.join(directory, name)) as f:
+                backups[os.path.splitext(name)[0]] = f.read()
+    return backups
+
+
+class Throttle:
+    """Token bucket allowing `rate` requests per second, in bursts of up to `rate`."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class StandinServer:
+    """Serves backups, comments, scores and OAuth tokens like okpy, on localhost.
+
+    Arguments:
+    backups -- {id: project file contents} served from /api/v3/backups/<id>
+    latency -- seconds added to every API response
+    jitter -- up to this many seconds more, chosen at random per request
+    error_rate -- fraction of API requests failed, without acting on them
+    error_status -- the status failed requests are answered with (default 500);
+        the client retries 503 but not 500, which might have been acted on
+    rate -- API requests per second accepted before answering 429 (default unlimited)
+    seed -- seed for the latency and error randomness
+    """
+
+    def __init__(
+        self,
+        backups,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=500,
+        rate=None,
+        seed=None,
+    ):
+        self.backups = backups
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle = Throttle(rate) if rate else None
+        self.random = random.Random(seed)
+        self.tokens = set()
+        self.comments = {}
+        self.scores = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def bind(self, host="127.0.0.1", port=0):
+        self._httpd = ThreadingHTTPServer((host, port), self.handler())
+        self._httpd.daemon_threads = True
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve on a background thread and return the server's base URL."""
+        self.bind(host, port)
+        threading.Thread(
+            target=self._httpd.serve_forever, name="ok-standin", daemon=True
+        ).start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self, host="127.0.0.1", port=0):
+        self.bind(host, port)
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def issue_token(self):
+        token = "standin-" + "%032x" % self.random.getrandbits(128)
+        with self._lock:
+            self.tokens.add(token)
+        return {
+            "access_token": token,
+            "expires_in": TOKEN_LIFETIME,
+            "refresh_token": "standin-refresh",
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": {
+                    f"{endpoint} {status}": count
+                    for (endpoint, status), count in sorted(self.requests.items())
+                },
+                "comments": {id: list(c) for id, c in self.comments.items()},
+                "scores": dict(self.scores),
+            }
+
+    def _count(self, endpoint, status):
+        with self._lock:
+            key = (endpoint, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def _degrade(self):
+        """Return the status to fail an API request with, or None, after adding latency."""
+        with self._lock:
+            delay = self.latency + self.jitter * self.random.random()
+            failed = self.random.random() < self.error_rate
+        if self.throttle and not self.throttle.allow():
+            return 429
+        time.sleep(delay)
+        return self.error_status if failed else None
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send_json(self, endpoint, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+                server._count(endpoint, status)
+
+            def form(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return dict(parse_qsl(self.rfile.read(length).decode()))
+
+            def api(self, endpoint, respond):
+                """Answer an authenticated API request, unless it is throttled or failed."""
+                query = dict(parse_qsl(urlparse(self.path).query))
+                status = server._degrade()
+                if status:
+                    self.send_json(endpoint, status, {"code": status, "message": "standin"})
+                elif query.get("access_token") not in server.tokens:
+                    self.send_json(endpoint, 401, {"code": 401, "message": "bad token"})
+                else:
+                    self.send_json(endpoint, 200, respond())
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                match = BACKUP.match(url.path)
+                if url.path == "/_stats":
+                    self.send_json("stats", 200, server.stats())
+                elif url.path == "/oauth/authorize":
+                    # approve straight away, as a signed-in user would
+                    query = dict(parse_qsl(url.query))
+                    location = query["redirect_uri"] + "?" + urlencode({"code": "standin"})
+                    self.send_response(302)
+                    self.send_header("Location", location)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    server._count("authorize", 302)
+                elif match and match.group(1) in server.backups:
+                    code = server.backups[match.group(1)]
+                    messages = [{"kind": "file_contents", "contents": {"ants.py": code}}]
+                    self.api("backup", lambda: {"code": 200, "data": {"messages": messages}})
+                else:
+                    self.send_json("unknown", 404, {"code": 404, "message": "not found"})
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                data = self.form()
+                match = COMMENT.match(path)
+                if path == "/oauth/token":
+                    self.send_json("token", 200, server.issue_token())
+                elif match and match.group(1) in server.backups:
+
+                    def comment():
+                        with server._lock:
+                            server.comments.setdefault(match.group(1), []).append(data)
+                        return {"code": 200, "data": {}}
+
+                    self.api("comment", comment)
+                elif path == "/api/v3/score/" and data.get("bid") in server.backups:
+
+                    def score():
+                        with server._lock:
+                            server.scores[data["bid"]] = data
+                        return {"code": 200, "data": {}}
+
+                    self.api("score", score)
+                else:
+                    self.send_json("unknown", 404, {"code": 404, "message": "not found"})
+
+            def log_message(self, format, *args):
+                return
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for okpy")
+    parser.add_argument("directory", help="directory of <backup id>.py files to serve")
+    parser.add_argument("--port", type=int, default=8065)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="milliseconds added to each API call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="up to this many milliseconds more"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="fraction of API calls that fail"
+    )
+    parser.add_argument(
+        "--error-status",
+        type=int,
+        default=500,
+        help="status failed API calls are answered with (default 500; try 503)",
+    )
+    parser.add_argument(
+        "--rate", type=float, help="API calls per second allowed before answering 429"
+    )
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    server = StandinServer(
+        load_backups(args.directory),
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate=args.rate,
+        seed=args.seed,
+    )
+    print(f"Serving {len(server.backups)} backup(s); run with")
+    print(f"  OK_SERVER_URL=http://127.0.0.1:{args.port}")
+    server.serve_forever(port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Declarative AST patterns for problem-specific checkers.
+
+A pattern is a Python expression describing the nodes it matches:
+
+    Assign(targets=[Name('max_range')], value=(limit := Num(n < 10000)))
+
+- `Type(...)` matches an ast node of that type. `Num`, `Str` and the other legacy
+  names match ast.Constant nodes holding that kind of value.
+- Positional arguments match the type's fields in order; keyword arguments
+  match the named field.
+- A literal matches an equal value. `field < value` (or any other comparison)
+  tests one of the node's fields.
+- `[a, b]` matches a list of exactly that many items, pairwise.
+- `_` matches anything.
+- `~p` negates a pattern, `p | q` matches either, `p & q` matches both.
+- `(name := p)` captures the value matched by `p` as `name`, for the message.
+
+A PatternChecker lists its Rules; the node types each pattern can match are
+worked out when the class is defined, so the fused walk only calls it on them.
+"""
+import ast
+import operator
+from typing import Callable, Dict, List, NamedTuple, Tuple, Union
+
+from analyzer import CONSTANT_VISITOR_NAMES, Checker, Comment
+
+# legacy constant node names, by the value types they stand for
+CONSTANT_TYPES = {}
+for value_type, legacy in CONSTANT_VISITOR_NAMES.items():
+    CONSTANT_TYPES.setdefault(legacy, []).append(value_type)
+# the single field of each legacy constant node, an alias for Constant.value;
+# Ellipsis has none
+CONSTANT_FIELDS = {"Num": "n", "Str": "s", "Bytes": "s", "NameConstant": "value"}
+
+COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+Matcher = Callable[[object, Dict[str, object]], bool]
+
+
+class PatternError(Exception):
+    """A pattern that can't be compiled."""
+
+
+class Pattern:
+    """A compiled pattern.
+
+    Arguments:
+    text -- the pattern, in the syntax described in this module's docstring
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        try:
+            tree = ast.parse(text.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise PatternError(f"Invalid pattern {text!r}: {e.msg}") from None
+        # visitor names (as in visit_<name>) of the nodes this pattern can match
+        self.visitors = sorted(root_visitors(tree, text))
+        if not self.visitors:
+            raise PatternError(f"Pattern {text!r} can't match any node type")
+        self.match = compile_pattern(tree, text)
+
+    def __repr__(self):
+        return f"Pattern({self.text!r})"
+
+
+def root_visitors(tree: ast.expr, text: str) -> set:
+    """Return the visitor names of every node type `tree` can match."""
+    if isinstance(tree, ast.NamedExpr):
+        return root_visitors(tree.value, text)
+    if isinstance(tree, ast.BinOp) and isinstance(tree.op, ast.BitOr):
+        return root_visitors(tree.left, text) | root_visitors(tree.right, text)
+    if isinstance(tree, ast.BinOp) and isinstance(tree.op, ast.BitAnd):
+        left = root_visitors(tree.left, text)
+        right = root_visitors(tree.right, text)
+        # a legacy constant name is the part of Constant holding that kind of value
+        return {a for a in left for b in right if includes(b, a)} | {
+            b for a in left for b in right if includes(a, b)
+        }
+    if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name):
+        return {tree.func.id}
+    raise PatternError(f"Pattern {text!r} must match nodes, not {ast.unparse(tree)}")
+
+
+def includes(general: str, specific: str) -> bool:
+    """Return whether every node visitor `specific` is called on is one `general` matches."""
+    return general == specific or (general == "Constant" and specific in CONSTANT_TYPES)
+
+
+def node_type(name: str, text: str):
+    """Return (type test, field names) for the node type called `name`."""
+    if name in CONSTANT_TYPES:
+        value_types = tuple(CONSTANT_TYPES[name])
+
+        def test(value):
+            return type(value) is ast.Constant and type(value.value) in value_types
+
+        if name not in CONSTANT_FIELDS:
+            return test, {}
+        return test, {CONSTANT_FIELDS[name]: "value"}
+    cls = getattr(ast, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, ast.AST)):
+        raise PatternError(f"Unknown node type {name} in pattern {text!r}")
+    fields = {field: field for field in cls._fields}
+    return (lambda value: isinstance(value, cls)), fields
+
+
+def compile_pattern(tree: ast.expr, text: str) -> Matcher:
+    """Compile a parsed pattern into a function of (value, captures)."""
+    if isinstance(tree, ast.Name) and tree.id == "_":
+        return lambda value, captures: True
+
+    if isinstance(tree, ast.Constant):
+        expected = tree.value
+        return lambda value, captures: value == expected
+
+    if isinstance(tree, ast.List):
+        items = [compile_pattern(item, text) for item in tree.elts]
+
+        def match_list(value, captures):
+            return (
+                isinstance(value, list)
+                and len(value) == len(items)
+                and all(item(v, captures) for item, v in zip(items, value))
+            )
+
+        return match_list
+
+    if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.Invert):
+        inner = compile_pattern(tree.operand, text)
+        return lambda value, captures: not inner(value, {})
+
+    if isinstance(tree, ast.BinOp) and isinstance(tree.op, (ast.BitOr, ast.BitAnd)):
+        left = compile_pattern(tree.left, text)
+        right = compile_pattern(tree.right, text)
+        if isinstance(tree.op, ast.BitOr):
+            return lambda value, caps: left(value, caps) or right(value, caps)
+        return lambda value, caps: left(value, caps) and right(value, caps)
+
+    if isinstance(tree, ast.NamedExpr):
+        name = tree.target.id
+        inner = compile_pattern(tree.value, text)
+
+        def capture(value, captures):
+            if not inner(value, captures):
+                return False
+            captures[name] = value
+            return True
+
+        return capture
+
+    if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name):
+        return compile_node(tree, text)
+
+    raise PatternError(f"Can't match {ast.unparse(tree)} in pattern {text!r}")
+
+
+def compile_node(tree: ast.Call, text: str) -> Matcher:
+    """Compile `Type(args..., field=pattern)` into a matcher."""
+    is_type, fields = node_type(tree.func.id, text)
+    names = list(fields)
+
+    checks = []
+    # comparisons (`field < value`) test a field by name; other positional
+    # arguments match the type's fields in order
+    positional = [arg for arg in tree.args if not is_field_test(arg, fields)]
+    if len(positional) > len(names):
+        raise PatternError(f"Too many arguments to {tree.func.id} in pattern {text!r}")
+    for name, arg in zip(names, positional):
+        checks.append((fields[name], compile_pattern(arg, text)))
+    for arg in tree.args:
+        if is_field_test(arg, fields):
+            checks.append((fields[arg.left.id], compile_comparison(arg, text)))
+    for keyword in tree.keywords:
+        if keyword.arg not in fields:
+            raise PatternError(
+                f"{tree.func.id} has no field {keyword.arg} in pattern {text!r}"
+            )
+        checks.append((fields[keyword.arg], compile_pattern(keyword.value, text)))
+
+    def match_node(value, captures):
+        if not is_type(value):
+            return False
+        return all(
+            check(getattr(value, field, None), captures) for field, check in checks
+        )
+
+    return match_node
+
+
+def is_field_test(arg: ast.expr, fields) -> bool:
+    return (
+        isinstance(arg, ast.Compare)
+        and isinstance(arg.left, ast.Name)
+        and arg.left.id in fields
+    )
+
+
+def compile_comparison(tree: ast.Compare, text: str) -> Matcher:
+    """Compile `field op literal` into a test of the field's value."""
+    if len(tree.ops) != 1 or type(tree.ops[0]) not in COMPARISONS:
+        raise PatternError(f"Unsupported comparison in pattern {text!r}")
+    test = COMPARISONS[type(tree.ops[0])]
+    try:
+        expected = ast.literal_eval(tree.comparators[0])
+    except ValueError:
+        message = f"Fields can only be compared to literals in {text!r}"
+        raise PatternError(message) from None
+
+    def compare(value, captures):
+        try:
+            return test(value, expected)
+        except TypeError:
+            return False
+
+    return compare
+
+
+class Rule(NamedTuple):
+    """A pattern and the comment left on each node it matches.
+
+    `message` is either the comment text or a function taking the pattern's
+    captures as keyword arguments and returning it.
+    """
+
+    pattern: Pattern
+    message: Union[str, Callable[..., str]]
+    fields: Tuple[str, ...] = ()
+
+    def comment(self, node: ast.AST, captures: Dict[str, object]) -> Comment:
+        message = self.message
+        if not isinstance(message, str):
+            message = message(**captures)
+        return Comment(node.lineno, message, self.fields)
+
+
+def rule(pattern: str, message, fields=()) -> Rule:
+    return Rule(Pattern(pattern), message, tuple(fields))
+
+
+def visitor(rules: List[Rule]):
+    """Build a visit method trying `rules`, in order, on each node it is called with."""
+
+    def visit(self, node):
+        for each in rules:
+            captures = {}
+            if each.pattern.match(node, captures):
+                self._comments.append(each.comment(node, captures))
+        self.generic_visit(node)
+
+    return visit
+
+
+class PatternChecker(Checker):
+    """A checker defined by a list of Rules rather than visit methods.
+
+    Subclasses set `rules`; a visit method is generated for each node type the
+    rules can match. Comments come out in walk order, and for a single node in
+    the order of `rules`, just as if each rule were an `if` in one visit method.
+    """
+
+    rules: List[Rule] = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        by_visitor = {}
+        for rule in cls.rules:
+            for name in rule.pattern.visitors:
+                by_visitor.setdefault(name, []).append(rule)
+        for name, rules in by_visitor.items():
+            setattr(cls, f"visit_{name}", visitor(rules))
+
+    def __init__(self, code):
+        self._comments = []
+
+    def comments(self):
+        yield from self._comments
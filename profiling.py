@@ -0,0 +1,86 @@
+import atexit
+import json
+import threading
+from typing import Dict, Tuple
+
+
+class CheckerRecord:
+    """Totals for one checker on one problem."""
+
+    __slots__ = ("runs", "construct", "visit", "comments_time", "nodes", "comments")
+
+    def __init__(self):
+        self.runs = 0
+        # seconds spent in the constructor, visit methods and comments()
+        self.construct = 0.0
+        self.visit = 0.0
+        self.comments_time = 0.0
+        # nodes dispatched to the checker, and comments it emitted
+        self.nodes = 0
+        self.comments = 0
+
+    @property
+    def total(self):
+        return self.construct + self.visit + self.comments_time
+
+    def merge(self, other):
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def as_dict(self):
+        out = {field: getattr(self, field) for field in self.__slots__}
+        out["total"] = self.total
+        return out
+
+
+class CheckerStats:
+    """Timings and hit counts for each checker on each problem.
+
+    Only checker runs in this process are counted; problems answered from the
+    analysis cache don't run any checkers.
+    """
+
+    def __init__(self):
+        self.records: Dict[Tuple[str, str], CheckerRecord] = {}
+        self._lock = threading.Lock()
+
+    def add(self, problem, checker, record):
+        with self._lock:
+            key = (checker, problem)
+            if key not in self.records:
+                self.records[key] = CheckerRecord()
+            self.records[key].merge(record)
+
+    def by_checker(self) -> Dict[str, CheckerRecord]:
+        out = {}
+        with self._lock:
+            for (checker, _), record in self.records.items():
+                out.setdefault(checker, CheckerRecord()).merge(record)
+        return out
+
+    def report(self):
+        """Return a table of checkers, most expensive first."""
+        lines = [
+            f"{'checker':<36}{'runs':>7}{'total ms':>10}{'visit ms':>10}"
+            f"{'nodes':>9}{'comments':>10}"
+        ]
+        by_cost = sorted(self.by_checker().items(), key=lambda item: -item[1].total)
+        for checker, record in by_cost:
+            lines.append(
+                f"{checker:<36}{record.runs:>7}{1000 * record.total:>10.1f}"
+                f"{1000 * record.visit:>10.1f}{record.nodes:>9}{record.comments:>10}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Write every (checker, problem) record to `path` as JSON."""
+        with self._lock:
+            records = [
+                {"checker": checker, "problem": problem, **record.as_dict()}
+                for (checker, problem), record in sorted(self.records.items())
+            ]
+        with open(path, "w") as f:
+            json.dump(records, f, indent=2)
+
+    def dump_at_exit(self, path):
+        atexit.register(self.dump, path)
@@ -0,0 +1,153 @@
+"""Regrading revised submissions without starting over.
+
+The comments accepted on every graded backup are saved in an AcceptedStore.
+When a student revises a backup, the new code is analyzed with
+analyzer.get_problems(code, previous=old_problems) so only changed problems are
+re-checked, and the comments accepted on the old revision are carried over
+with carry_comments. `cli.py --revision NEW=OLD` does all of this.
+"""
+import json
+import os
+import tempfile
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from analyzer import Comment, Problem
+
+
+class LineMap:
+    """Maps line numbers of one revision of a problem to the next.
+
+    Lines are matched with difflib. A line inside a block that was replaced by
+    a block of the same length is taken to have been edited in place and maps
+    to its counterpart; lines that were deleted or rewritten map to None.
+
+    Arguments:
+    old -- the problem in the earlier revision
+    new -- the same problem in the later revision
+    """
+
+    def __init__(self, old: Problem, new: Problem):
+        self.old_start = old.initial_line_number
+        self.new_start = new.initial_line_number
+        # (first old line, first new line, length), relative to each problem's start
+        self.blocks: List[Tuple[int, int, int]] = []
+        if old.code == new.code:
+            self.blocks.append((0, 0, len(old.code.splitlines())))
+        else:
+            matcher = SequenceMatcher(
+                None, old.code.splitlines(), new.code.splitlines(), autojunk=False
+            )
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == "equal" or (tag == "replace" and i2 - i1 == j2 - j1):
+                    self.blocks.append((i1, j1, i2 - i1))
+        self._starts = [block[0] for block in self.blocks]
+
+    def __getitem__(self, line_num: int) -> Optional[int]:
+        """Return where absolute line `line_num` of the old revision is now, or None."""
+        line = line_num - self.old_start
+        i = bisect_right(self._starts, line) - 1
+        if i < 0:
+            return None
+        old, new, length = self.blocks[i]
+        if line >= old + length:
+            return None
+        return line - old + new + self.new_start
+
+
+def carry_comments(
+    previous: Dict[str, Problem],
+    problems: Dict[str, Problem],
+    accepted: Dict[str, List[Comment]],
+) -> Tuple[Dict[str, List[Comment]], List[Tuple[str, Comment]]]:
+    """Move comments accepted on an earlier revision onto the current one.
+
+    Arguments:
+    previous -- get_problems output for the earlier revision
+    problems -- get_problems output for the current revision
+    accepted -- comments accepted on the earlier revision, by problem name
+
+    Returns the carried comments by problem name, renumbered for the current
+    revision, and the (problem name, comment) pairs whose lines no longer exist.
+    """
+    carried = {}
+    dropped = []
+    for name, comments in accepted.items():
+        if name not in previous or name not in problems:
+            dropped.extend((name, comment) for comment in comments)
+            continue
+        lines = LineMap(previous[name], problems[name])
+        carried[name] = []
+        for comment in comments:
+            line_num = lines[comment.line_num]
+            if line_num is None:
+                dropped.append((name, comment))
+            else:
+                carried[name].append(comment._replace(line_num=line_num))
+    return carried, dropped
+
+
+def unseen_suggestions(
+    previous: Dict[str, Problem], problems: Dict[str, Problem]
+) -> Dict[str, Problem]:
+    """Return `problems` without the suggestions already made on the earlier revision.
+
+    The grader accepted or rejected those the first time; the accepted ones
+    come back through carry_comments.
+    """
+    out = {}
+    for name, problem in problems.items():
+        if name not in previous:
+            out[name] = problem
+            continue
+        lines = LineMap(previous[name], problem)
+        seen = {(lines[c.line_num], c.comment) for c in previous[name].comments}
+        comments = [c for c in problem.comments if (c.line_num, c.comment) not in seen]
+        out[name] = problem._replace(comments=comments)
+    return out
+
+
+ACCEPTED_DIR = ".accepted_comments"
+
+
+class AcceptedStore:
+    """The comments accepted on each graded backup, one JSON file per backup id.
+
+    Arguments:
+    directory -- where the files live (default ".accepted_comments")
+    """
+
+    def __init__(self, directory=ACCEPTED_DIR):
+        self.directory = directory
+
+    def _path(self, id):
+        return os.path.join(self.directory, f"{id}.json")
+
+    def save(self, id, accepted: Dict[str, List[Comment]]):
+        """Record the comments accepted on backup `id`, by problem name."""
+        data = {
+            name: [[comment.line_num, comment.comment] for comment in comments]
+            for name, comments in accepted.items()
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self._path(id))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load(self, id) -> Optional[Dict[str, List[Comment]]]:
+        """Return the comments accepted on backup `id`, or None if none were saved."""
+        try:
+            with open(self._path(id)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {
+            name: [Comment(line_num, comment) for line_num, comment in comments]
+            for name, comments in data.items()
+        }
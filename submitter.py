@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional
+
+from colorama import Fore, Style
+
+from analyzer import Comment
+from backup_cache import write_atomic
+from ok_interface import BACKOFF, MAX_ATTEMPTS, retry, submit_comment, submit_grade
+
+# number of backups being submitted to okpy at once
+MAX_CONCURRENT_BACKUPS = 2
+# where graded backups wait until okpy has accepted all of their comments and grade
+OUTBOX_DIR = ".outbox"
+
+
+class Outgoing(NamedTuple):
+    comments: List[Comment]
+    score: int
+    message: str
+    # comments okpy has already accepted, from the start of `comments`
+    posted: int = 0
+
+
+class Outbox:
+    """Graded backups that aren't fully submitted yet, one JSON file per backup id.
+
+    A backup is saved before its submission starts and removed once okpy has
+    its grade, and the count of comments already posted is updated as they go,
+    so a failed or interrupted submission picks up where it stopped instead of
+    posting comments twice or needing the backup graded again.
+
+    Arguments:
+    directory -- where the files live (default ".outbox")
+    """
+
+    def __init__(self, directory=OUTBOX_DIR):
+        self.directory = directory
+
+    def _path(self, id):
+        return os.path.join(self.directory, f"{id}.json")
+
+    def ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[: -len(".json")] for name in names if name.endswith(".json"))
+
+    def __contains__(self, id):
+        return os.path.exists(self._path(id))
+
+    def save(self, id, outgoing: Outgoing):
+        data = {
+            "comments": [[c.line_num, c.comment] for c in outgoing.comments],
+            "score": outgoing.score,
+            "message": outgoing.message,
+            "posted": outgoing.posted,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self._path(id), json.dumps(data).encode())
+
+    def load(self, id) -> Optional[Outgoing]:
+        try:
+            with open(self._path(id)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        comments = [Comment(line_num, comment) for line_num, comment in data["comments"]]
+        return Outgoing(comments, data["score"], data["message"], data["posted"])
+
+    def remove(self, id):
+        try:
+            os.unlink(self._path(id))
+        except FileNotFoundError:
+            pass
+
+
+class SubmissionQueue:
+    """Submits comments and grades to okpy in the background.
+
+    Each backup is submitted as one job: its comments in order, then its grade.
+    Jobs are kept in the outbox until they finish, so one that fails is resumed
+    by resume(), on a later launch, from the first comment okpy didn't accept.
+
+    A request is only retried if okpy can't have acted on it: it was throttled,
+    or the connection was never made. Anything else (a read timeout, a 500)
+    might have posted a comment already, and posting it again would duplicate
+    it, so the backup's job fails instead and is reported by join().
+
+    Arguments:
+    max_concurrent -- number of backups submitted at once
+    max_attempts -- attempts per request before a backup's job fails
+    backoff -- seconds to wait before the first retry, doubling after each one
+    outbox -- where jobs are kept until they finish (default: Outbox())
+    offline -- only save backups in the outbox, never contacting okpy; they are
+        sent by a later online session or `python3 submitter.py`
+    """
+
+    def __init__(
+        self,
+        max_concurrent=MAX_CONCURRENT_BACKUPS,
+        max_attempts=MAX_ATTEMPTS,
+        backoff=BACKOFF,
+        outbox=None,
+        offline=False,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.outbox = outbox or Outbox()
+        self.offline = offline
+        # ids saved to the outbox but not submitted, in offline mode
+        self.held = []
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        self.pending = {}
+        # (id, exception) for each backup whose submission failed
+        self.failed = []
+
+    def put(self, id, comments, score, message):
+        """Queue a graded backup for submission and return immediately.
+
+        Arguments:
+        id -- Submission ID that was graded
+        comments -- Comments to post, in order
+        score -- Composition score recieved
+        message -- Final message to send
+        """
+        outgoing = Outgoing(list(comments), score, message)
+        self.outbox.save(id, outgoing)
+        if self.offline:
+            self.held.append(id)
+        else:
+            self._start(id, outgoing)
+
+    def resume(self):
+        """Queue every backup left in the outbox, skipping the comments already posted."""
+        ids = self.outbox.ids()
+        for id in ids:
+            outgoing = self.outbox.load(id)
+            if outgoing is not None:
+                self._start(id, outgoing)
+        return ids
+
+    def _start(self, id, outgoing):
+        future = self.executor.submit(self._submit_backup, id, outgoing)
+        self.pending[id] = future
+        future.add_done_callback(lambda future: self._done(id, future))
+
+    def join(self):
+        """Wait for every queued backup to finish submitting, then report any failures."""
+        if self.pending:
+            print(f"Waiting for {len(self.pending)} submission(s) to finish...")
+        self.executor.shutdown(wait=True)
+        if self.held:
+            print(
+                f"{len(self.held)} grade(s) saved in {self.outbox.directory}, not submitted "
+                f"while offline; run `python3 submitter.py` to send them"
+            )
+        if not self.failed:
+            return
+        print(
+            f"{Fore.RED}{len(self.failed)} submission(s) failed; they are kept in "
+            f"{self.outbox.directory} and sent on the next launch:",
+            file=sys.stderr,
+        )
+        for id, error in self.failed:
+            message = traceback.format_exception_only(type(error), error)[-1]
+            print(f"  #{id}: {message.strip()}", file=sys.stderr)
+            outgoing = self.outbox.load(id)
+            if outgoing is not None:
+                posted = f"{outgoing.posted} of {len(outgoing.comments)}"
+                print(f"    {posted} comments already posted", file=sys.stderr)
+        print(f"{Style.RESET_ALL}", file=sys.stderr)
+
+    def _submit_backup(self, id, outgoing):
+        for i in range(outgoing.posted, len(outgoing.comments)):
+            comment = outgoing.comments[i]
+            self._retry(submit_comment, id, comment.line_num, comment.comment)
+            outgoing = outgoing._replace(posted=i + 1)
+            self.outbox.save(id, outgoing)
+        self._retry(submit_grade, id, outgoing.score, outgoing.message)
+        self.outbox.remove(id)
+
+    def _retry(self, func, *args):
+        return retry(func, *args, attempts=self.max_attempts, backoff=self.backoff)
+
+    def _done(self, id, future):
+        # reported by join(), since the grader's screen is cleared before then
+        self.pending.pop(id, None)
+        if not future.cancelled() and future.exception():
+            self.failed.append((id, future.exception()))
+
+
+
+def main():
+    """Send every backup left in the outbox to okpy."""
+    submissions = SubmissionQueue()
+    ids = submissions.resume()
+    print(f"Sending {len(ids)} graded backup(s)")
+    submissions.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Grading-session telemetry: timestamped spans written to a JSON-lines file.
+
+Usage: python3 telemetry.py FILE [FILE ...]
+
+prints latency percentiles for each stage recorded in FILE, and how much of
+the session the grader spent waiting rather than reviewing.
+"""
+import argparse
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# stages in which the grader is blocked on the network or the analyzer, not reviewing
+WAIT_STAGES = ("backup_wait", "submit_wait")
+# stages in which the grader is reviewing code and answering prompts
+REVIEW_STAGES = ("prompt",)
+PERCENTILES = (50, 90, 99)
+
+
+class Telemetry:
+    """Records spans to a JSON-lines file, one object per span.
+
+    Each span has a `stage`, its wall-clock `start`, its `duration` in seconds,
+    the `thread` it ran on, an `error` if it raised, and any attributes given to
+    span() or set by context() on the same thread. Nothing is recorded until
+    open() is called, and spans are then cheap enough to leave in place.
+    """
+
+    def __init__(self):
+        self.file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def open(self, path):
+        """Start appending spans to `path`."""
+        self.file = open(path, "a")
+
+    def close(self):
+        with self._lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    @contextmanager
+    def context(self, **attrs):
+        """Add `attrs` to every span recorded on this thread inside the block."""
+        saved = getattr(self._local, "attrs", {})
+        self._local.attrs = {**saved, **attrs}
+        try:
+            yield
+        finally:
+            self._local.attrs = saved
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Time the block as a span of `stage`, yielding `attrs` for the block to add to."""
+        if self.file is None:
+            yield attrs
+            return
+        start = time.time()
+        begin = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            context = getattr(self._local, "attrs", {})
+            duration = time.perf_counter() - begin
+            self.record(stage, start, duration, **{**context, **attrs}, error=error)
+
+    def record(self, stage, start, duration, **attrs):
+        record = {
+            "stage": stage,
+            "start": start,
+            "duration": duration,
+            "thread": threading.current_thread().name,
+        }
+        record.update((key, value) for key, value in attrs.items() if value is not None)
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self.file is not None:
+                self.file.write(line)
+                self.file.flush()
+
+
+telemetry = Telemetry()
+
+
+def load_spans(paths) -> List[dict]:
+    spans = []
+    for path in paths:
+        with open(path) as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, -(-len(sorted_values) * p // 100) - 1)
+    return sorted_values[int(index)]
+
+
+def summarize(spans) -> str:
+    """Return a report of per-stage latency percentiles and the session's wait time."""
+    durations: Dict[str, List[float]] = {}
+    for span in spans:
+        durations.setdefault(span["stage"], []).append(span["duration"])
+
+    header = "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    lines = [f"{'stage':<18}{'count':>7}{'total s':>10}{header}"]
+    for stage, values in sorted(durations.items()):
+        values.sort()
+        cells = "".join(f"{1000 * percentile(values, p):>10.0f}" for p in PERCENTILES)
+        lines.append(f"{stage:<18}{len(values):>7}{sum(values):>10.2f}{cells}")
+
+    if spans:
+        session = max(s["start"] + s["duration"] for s in spans) - min(
+            s["start"] for s in spans
+        )
+        waiting = sum(sum(durations.get(stage, [])) for stage in WAIT_STAGES)
+        reviewing = sum(sum(durations.get(stage, [])) for stage in REVIEW_STAGES)
+        backups = len(durations.get("backup", []))
+        lines.append("")
+        lines.append(f"session: {session:.1f} s over {backups} backup(s)")
+        if session > 0:
+            lines.append(
+                f"reviewing: {reviewing:.1f} s ({100 * reviewing / session:.0f}%), "
+                f"waiting on network/analysis: {waiting:.1f} s "
+                f"({100 * waiting / session:.0f}%)"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize telemetry recorded with cli.py --telemetry"
+    )
+    parser.add_argument("paths", nargs="+", help="telemetry JSON-lines files")
+    args = parser.parse_args()
+    print(summarize(load_spans(args.paths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 # fmt: off
 # noinspection PyDictCreation
 templates = {
@@ -285,38 +287,134 @@ templates = {
 }
 
 
-def template_completer(name):
-    relevant_keys = list(templates_by_problem[name]) + list(
-        templates_by_problem["common"]
+class CompletionIndex:
+    """Template keys for one problem, indexed for tab completion.
+
+    A prefix trie answers "keys starting with the text", and an inverted index from
+    hyphen-separated tokens to keys answers the fallback "keys sharing a whole word
+    with the text". Both keep keys in the order they are listed for the problem.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(dict.fromkeys(keys))
+        self.trie = {"": list(range(len(self.keys)))}
+        self.tokens = {}
+        for i, key in enumerate(self.keys):
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {"": []})
+                node[""].append(i)
+            for token in key.split("-"):
+                positions = self.tokens.setdefault(token, [])
+                if not positions or positions[-1] != i:
+                    positions.append(i)
+
+    def complete(self, text):
+        """Return every completion of `text`, best matches first."""
+        node = self.trie
+        for char in text.strip():
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            if node[""]:
+                return [self.keys[i] for i in node[""]]
+
+        matches = set()
+        for word in text.split("-"):
+            if word:
+                matches.update(self.tokens.get(word, ()))
+        return [self.keys[i] for i in sorted(matches)]
+
+
+@lru_cache(maxsize=None)
+def completion_index(name):
+    return CompletionIndex(
+        list(templates_by_problem[name]) + list(templates_by_problem["common"])
     )
 
-    def completer(text, state):
-        cnt = 0
-        out = set()
 
-        for key in relevant_keys:
-            if key in out:
-                continue
-            if key.startswith(text.strip()):
-                if cnt == state:
-                    return key
-                out.add(key)
-                cnt += 1
+def subsequence_score(query, key):
+    """Score `key` by how well the characters of `query` appear in order in it (0 if they don't).
+
+    Matched characters score 1, plus 2 when they follow the previous match directly
+    and 3 when they start a hyphen-separated word, normalized to at most 1.
+    """
+    score = 0
+    pos = 0
+    prev = -2
+    for char in query:
+        i = key.find(char, pos)
+        if i < 0:
+            return 0
+        score += 1
+        if i == prev + 1:
+            score += 2
+        if i == 0 or key[i - 1] == "-":
+            score += 3
+        prev = i
+        pos = i + 1
+    return score / (6 * len(query))
+
 
-        if out:
-            return
+def trigrams(text):
+    text = " ".join(text.lower().split())
+    return {text[i : i + 3] for i in range(len(text) - 2)}
 
-        for key in relevant_keys:
-            if key in out:
+
+class TemplateSearch:
+    """Fuzzy, ranked search over template keys and text for one problem.
+
+    Keys are scored by subsequence_score and texts by the fraction of the query's
+    trigrams they contain, looked up through an inverted trigram index.
+    """
+
+    # how much a match in the template text counts relative to a match in the key
+    TEXT_WEIGHT = 0.7
+
+    def __init__(self, entries):
+        self.keys = []
+        self.index = {}
+        for key, text in entries:
+            if key in self.keys:
                 continue
-            for word in text.split("-"):
-                if word and word in key.split("-"):
-                    if cnt == state:
-                        return key
-                    out.add(key)
-                    cnt += 1
-                    break
+            for trigram in trigrams(f"{key.replace('-', ' ')} {text or ''}"):
+                self.index.setdefault(trigram, []).append(len(self.keys))
+            self.keys.append(key)
+
+    def search(self, query, k=5):
+        """Return up to `k` keys matching `query`, best first."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        scores = [subsequence_score(query.replace(" ", "-"), key) for key in self.keys]
+        query_trigrams = trigrams(query.replace("-", " "))
+        for trigram in query_trigrams:
+            for i in self.index.get(trigram, ()):
+                scores[i] += self.TEXT_WEIGHT / len(query_trigrams)
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i]
+        )
+        return [self.keys[i] for i in ranked[:k]]
+
 
+@lru_cache(maxsize=None)
+def template_search(name):
+    return TemplateSearch(
+        list(templates_by_problem[name].items())
+        + list(templates_by_problem["common"].items())
+    )
+
+
+def template_completer(name):
+    index = completion_index(name)
+    candidates = []
+
+    def completer(text, state):
+        if state == 0:
+            candidates[:] = index.complete(text)
+        if state < len(candidates):
+            return candidates[state]
         return None
 
     return completer
@@ -0,0 +1,83 @@
+"""The fused checker walk must comment exactly as running each checker on its own
+does, and checker packs must import without analyzer having been imported first.
+
+Run with `python3 -m pytest`.
+"""
+import ast
+import os
+import subprocess
+import sys
+import warnings
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+import analyzer  # noqa: E402
+from analyzer_bench import generate_corpus, problem_slices  # noqa: E402
+
+# large enough for every style generate_submission produces to show up
+CORPUS_SIZE = 40
+
+analyzer.load_pack()
+
+
+@pytest.fixture(scope="module")
+def slices():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return problem_slices(generate_corpus(CORPUS_SIZE))
+
+
+def check_separately(name, code):
+    """check_problem as it was before fusing: one full walk per checker."""
+    comments = []
+    for checker in analyzer.CHECKERS + analyzer.TARGETED_CHECKERS.get(name, []):
+        instance = checker(analyzer.SourceText(code))
+        instance.visit(ast.parse(code))
+        comments.extend(instance.comments())
+    comments.sort(key=lambda comment: comment.line_num)
+    return comments
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("name", sorted(analyzer.PROBLEMS))
+def test_fused_matches_separate(slices, name):
+    assert slices[name], f"the corpus has no {name}"
+    for code in slices[name]:
+        assert analyzer.check_problem(name, code) == check_separately(name, code)
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_corpus_exercises_checkers(slices):
+    comments = [
+        comment
+        for name, codes in slices.items()
+        for code in codes
+        for comment in analyzer.check_problem(name, code)
+    ]
+    assert len({comment.comment for comment in comments}) > 5
+    assert all(isinstance(comment.fields, tuple) for comment in comments)
+
+
+@pytest.mark.parametrize("module", ["checker_packs.ants", "checker_packs.hog"])
+def test_pack_imports_before_analyzer(module):
+    root = os.path.dirname(os.path.abspath(__file__))
+    run = subprocess.run([sys.executable, "-c", f"import {module}"], cwd=root)
+    assert run.returncode == 0
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_ast_mode_skips_markers_in_strings():
+    code = generate_corpus(1)[0]
+    mentioned = code.replace(
+        '"""CS 61A presents Ants Vs. SomeBees."""',
+        '"""CS 61A presents Ants Vs. SomeBees.\n\nSee class ThrowerAnt and def throw_at.\n"""',
+        1,
+    )
+    # the first textual match is now the one in the docstring
+    assert mentioned.index("class ThrowerAnt") < mentioned.index("class ThrowerAnt(")
+    expected = analyzer.get_problems(code, cache=None)["ThrowerAnt"]
+    found = analyzer.get_problems(mentioned, cache=None, mode="ast")["ThrowerAnt"]
+    assert found.code == expected.code
+    assert found.initial_line_number == expected.initial_line_number + 3
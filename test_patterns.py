@@ -0,0 +1,69 @@
+"""Compiling and matching the patterns checker packs are written in."""
+import ast
+import os
+import subprocess
+import sys
+
+import pytest
+
+from patterns import Pattern, PatternError
+
+
+def matches(pattern, code):
+    """Return the line numbers of the nodes in `code` that `pattern` matches."""
+    compiled = Pattern(pattern)
+    return [
+        node.lineno
+        for node in ast.walk(ast.parse(code))
+        if compiled.match(node, {})
+    ]
+
+
+def test_imports_on_its_own():
+    root = os.path.dirname(os.path.abspath(__file__))
+    run = subprocess.run([sys.executable, "-c", "import patterns"], cwd=root)
+    assert run.returncode == 0
+
+
+def test_legacy_constants():
+    code = "x = 3\ny = 'Hive'\nz = ...\nw = None\n"
+    assert matches("Num(n < 10)", code) == [1]
+    assert matches("Str('Hive')", code) == [2]
+    assert matches("Ellipsis()", code) == [3]
+    assert matches("NameConstant(None)", code) == [4]
+
+
+def test_captures_and_operators():
+    compiled = Pattern("Assign(targets=[Name('max_range')], value=(limit := Num()))")
+    captures = {}
+    node = ast.parse("max_range = 10").body[0]
+    assert compiled.match(node, captures)
+    assert captures["limit"].value == 10
+    assert compiled.visitors == ["Assign"]
+    assert Pattern("Name('a') | Attribute(attr='a')").visitors == ["Attribute", "Name"]
+    assert matches("Compare(ops=[~IsNot()])", "a != b\nc is not d\n") == [1]
+
+
+def test_intersections():
+    assert Pattern("Num() & Constant()").visitors == ["Num"]
+    assert Pattern("Constant() & (Num() | Str())").visitors == ["Num", "Str"]
+    assert Pattern("Name() & Name(id='a')").visitors == ["Name"]
+    assert matches("Num() & Constant(value=3)", "x = 3\ny = 4\n") == [1]
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "Nonsense()",
+        "Ellipsis(1)",
+        "Num(1, 2)",
+        "Name(spam=1)",
+        "Num(n < x)",
+        "1 + 2",
+        "Name() & Attribute()",
+        "Num() & Str()",
+    ],
+)
+def test_invalid_patterns(pattern):
+    with pytest.raises(PatternError):
+        Pattern(pattern)
@@ -0,0 +1,63 @@
+"""Moving accepted comments from one revision of a backup to the next."""
+from analyzer import Comment, Problem
+from revisions import LineMap, carry_comments, unseen_suggestions
+
+
+def problem(lines, start=1, comments=()):
+    return Problem("\n".join(lines), start, list(comments))
+
+
+OLD = ["def f():", "    a = 1", "    b = 2", "    c = 3", "    return a"]
+
+
+def test_unchanged_problem_moves_with_its_start():
+    lines = LineMap(problem(OLD, start=10), problem(OLD, start=14))
+    assert [lines[n] for n in range(10, 15)] == [14, 15, 16, 17, 18]
+    assert lines[9] is None
+    assert lines[15] is None
+
+
+def test_equal_blocks_around_an_insertion():
+    new = OLD[:2] + ["    x = 0", "    y = 0"] + OLD[2:]
+    lines = LineMap(problem(OLD), problem(new))
+    assert [lines[n] for n in range(1, 6)] == [1, 2, 5, 6, 7]
+
+
+def test_same_length_replacement_is_edited_in_place():
+    new = OLD[:2] + ["    b = 20", "    c = 30"] + OLD[4:]
+    lines = LineMap(problem(OLD), problem(new))
+    assert [lines[n] for n in range(1, 6)] == [1, 2, 3, 4, 5]
+
+
+def test_deleted_and_rewritten_lines_map_to_none():
+    deleted = LineMap(problem(OLD), problem(OLD[:1] + OLD[2:]))
+    assert [deleted[n] for n in range(1, 6)] == [1, None, 2, 3, 4]
+    rewritten = LineMap(problem(OLD), problem(OLD[:1] + ["    a, b, c = 1, 2, 3"] + OLD[4:]))
+    assert [rewritten[n] for n in range(1, 6)] == [1, None, None, None, 3]
+
+
+def test_carry_comments():
+    previous = {"f": problem(OLD, start=3), "gone": problem(OLD)}
+    new = ["# moved down"] + OLD[:3] + OLD[4:]
+    problems = {"f": problem(new, start=3)}
+    accepted = {
+        "f": [Comment(4, "on a"), Comment(6, "on c"), Comment(7, "on return")],
+        "gone": [Comment(1, "on def")],
+    }
+    carried, dropped = carry_comments(previous, problems, accepted)
+    assert carried == {"f": [Comment(5, "on a"), Comment(7, "on return")]}
+    assert dropped == [("f", Comment(6, "on c")), ("gone", Comment(1, "on def"))]
+
+
+def test_unseen_suggestions():
+    old = problem(OLD, comments=[Comment(2, "name a"), Comment(3, "name b")])
+    suggested = [
+        Comment(2, "name z"),
+        Comment(3, "name a"),
+        Comment(4, "name b"),
+        Comment(2, "name a"),
+    ]
+    new = problem(["def f():", "    z = 0"] + OLD[1:], comments=suggested)
+    out = unseen_suggestions({"f": old}, {"f": new, "g": new})
+    assert out["f"].comments == [Comment(2, "name z"), Comment(2, "name a")]
+    assert out["g"] is new